@@ -1,19 +1,41 @@
 import os
-from flask import Flask, render_template, request, redirect, session, url_for, flash, jsonify
+from flask import Flask, Response, render_template, request, redirect, session, url_for, flash, jsonify, send_file, abort
 import json
 import time
 from datetime import datetime
 from dotenv import load_dotenv
 import mysql.connector
-import requests
 from flask_socketio import SocketIO, join_room, leave_room, emit
-from collections import deque
 from ultralytics import YOLO
-from PIL import Image
-import io, base64, numpy as np
-import threading, re
+import base64
+import uuid
 from functools import wraps
 from urllib.parse import quote_plus
+from db import init_db, get_db
+from metrics import Metrics
+from feedback_live import FeedbackBroadcaster
+from glyphs import GlyphIndex, IMMUTABLE_CACHE
+from sign_video import SignVideoCompositor
+from room_registry import room_registry_from_env
+from server_session import init_server_session
+from llm_client import ollama_from_env, LLMBusy, LLMError, parse_json_reply
+from llm_cache import cache_from_env
+from conversation_store import conversations_from_env
+from llm_jobs import FINISHED, OLLAMA_KEEP_ALIVE, PRIORITIES, default_priority, describe_job, job_queue_from_env
+from llm_prompts import (
+    GRAMMAR_MODEL, CHATBOT_MODEL, STYLE_ENHANCE_STYLES, SUPPORTED_LANGUAGES,
+    grammar_prompt, shape_grammar, style_prompt, shape_style, enhancement_prompt, shape_enhancement,
+    translation_prompt, shape_translation, shape_chatbot,
+)
+from sign_session import SignSessionRegistry
+from inference import InferenceScheduler
+from preprocess import FramePreprocessor
+from motion_gate import MotionGate
+from roi_tracker import RoiTracker
+from smoothing import LabelSmoother
+from detect_pipeline import CONF_THRESHOLD, SIGN_TIMINGS, DetectPipeline
+from backends import BATCHED_BACKENDS, load_detector, parity_check
+from quantize import compare_models, require_held_out
 
 def login_required(f):
     """Decorator to require login for protected routes"""
@@ -34,6 +56,15 @@ app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY") or "mysecret"
 app.config['SECRET_KEY'] = app.secret_key
 
+# Sessions live server-side; the cookie only carries a signed session id (SESSION_BACKEND=cookie restores cookie sessions)
+session_store = init_server_session(
+    app,
+    backend=os.getenv("SESSION_BACKEND") or "filesystem",
+    directory=os.getenv("SESSION_DIR") or "flask_session",
+    redis_url=os.getenv("SESSION_REDIS_URL"),
+    sweep_interval=int(os.getenv("SESSION_SWEEP_SECONDS") or 300),
+)
+
 # Configure SQLAlchemy for chat subsystem (separate DB)
 chat_db_uri = os.getenv("CHAT_DATABASE_URI")
 if not chat_db_uri:
@@ -49,7 +80,46 @@ if not chat_db_uri:
 app.config['SQLALCHEMY_DATABASE_URI'] = chat_db_uri
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-socketio = SocketIO(app, cors_allowed_origins="*")
+socketio = SocketIO(app, cors_allowed_origins="*", message_queue=os.getenv("SOCKETIO_MESSAGE_QUEUE"))
+
+# Prometheus histograms/counters for the hot paths, served at /metrics (METRICS=0 turns them off)
+metrics = Metrics(enabled=os.getenv("METRICS", "1") == "1")
+metrics.instrument_socketio(socketio)
+
+# One shared Ollama client: pooled keep-alive connections, per-model concurrency limits, timeouts
+ollama = ollama_from_env()
+if metrics.enabled:
+    ollama.observer = metrics.observe_llm
+
+# Results of grammar/style/translation calls, keyed by (model, endpoint, normalized text, options)
+llm_cache = cache_from_env()
+
+# Chatbot histories live server-side; the session cookie only carries the conversation id
+conversations = conversations_from_env()
+
+# Queued LLM jobs (Celery workers if LLM_JOBS_REDIS_URL is set); finished jobs are pushed to "job:<id>" rooms
+job_queue = job_queue_from_env(
+    ollama, llm_cache, conversations,
+    on_update=lambda record: socketio.emit("llm-job", record, to=f"job:{record['job_id']}"),
+)
+LLM_JOB_WAIT_SECONDS = float(os.getenv("LLM_JOB_WAIT_SECONDS") or 150)
+
+def queued_llm(kind, params):
+    """Run an LLM job through job_queue and wait for its result.
+
+    Only for the synchronous compatibility endpoints; the pages submit to /api/jobs and poll
+    instead of holding a request open. Chatbot jobs run ahead of the batch rewrites.
+    Raises LLMBusy if the queue is full or the job is still unfinished after LLM_JOB_WAIT_SECONDS
+    (it keeps running and can be polled), LLMError if it failed.
+    """
+    record = job_queue.submit(describe_job(kind, params), default_priority(kind))
+    if record["status"] not in FINISHED:
+        record = job_queue.wait(record["job_id"], LLM_JOB_WAIT_SECONDS) or record
+    if record["status"] == "failed":
+        raise LLMError(record.get("error") or "LLM job failed")
+    if record["status"] != "done":
+        raise LLMBusy(f"Still working on it; poll /api/jobs/{record['job_id']}")
+    return record["result"]
 
 # Initialize chat blueprint and models
 try:
@@ -57,8 +127,6 @@ try:
     init_chat(app, socketio)
 
     # Back-compat proxy routes so existing chat JS paths continue to work
-    from flask import Response
-
     def _proxy(path):
         # Preserve method and body using 307 redirect to the /chat-prefixed endpoint
         return redirect(f"/chat{path}", code=307)
@@ -123,15 +191,22 @@ except Exception as _e:
     print("[WARN] Chat subsystem initialization failed:", _e)
 
 # --------------------- DB CONNECTION ---------------------
-mydb = mysql.connector.connect(
+# Routes borrow one pooled connection per request through get_db()
+database = init_db(
+    app,
+    pool_size=int(os.getenv("DB_POOL_SIZE") or 10),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT") or 5),
     host=os.getenv("MYSQL_HOST") or "localhost",
     user=os.getenv("MYSQL_USER") or "root",
     password=os.getenv("MYSQL_PASSWORD") or "",
     database=os.getenv("MYSQL_DATABASE") or "signverse_app"
 )
+if metrics.enabled:
+    database.observer = metrics.observe_query
 
 # --------------------- TABLE CREATION ---------------------
-cur = mydb.cursor()
+_conn = database.acquire()
+cur = _conn.cursor()
 cur.execute("""
 CREATE TABLE IF NOT EXISTS users (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -166,6 +241,40 @@ CREATE TABLE IF NOT EXISTS feedback_reactions (
 );
 """)
 cur.execute("""
+CREATE TABLE IF NOT EXISTS feedback_stats (
+    id TINYINT PRIMARY KEY,
+    total_feedback INT NOT NULL DEFAULT 0,
+    total_likes INT NOT NULL DEFAULT 0,
+    total_dislikes INT NOT NULL DEFAULT 0
+)
+""")
+# A NULL reaction means "reacted, then undid it", so toggling is a single upsert (see react_feedback)
+cur.execute("""
+SELECT IS_NULLABLE FROM information_schema.COLUMNS
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'feedback_reactions' AND COLUMN_NAME = 'reaction'
+""")
+if cur.fetchone()[0] == 'NO':
+    cur.execute("ALTER TABLE feedback_reactions MODIFY reaction ENUM('like','dislike') NULL")
+# feedback.likes/dislikes and the feedback_stats row are maintained incrementally from here on;
+# bring them in line with the reactions table once at startup
+cur.execute("""
+UPDATE feedback f
+LEFT JOIN (
+    SELECT feedback_id, SUM(reaction='like') AS likes, SUM(reaction='dislike') AS dislikes
+    FROM feedback_reactions GROUP BY feedback_id
+) r ON r.feedback_id = f.id
+SET f.likes = COALESCE(r.likes, 0), f.dislikes = COALESCE(r.dislikes, 0)
+""")
+cur.execute("""
+INSERT INTO feedback_stats (id, total_feedback, total_likes, total_dislikes)
+SELECT 1,
+       (SELECT COUNT(*) FROM feedback),
+       (SELECT COUNT(*) FROM feedback_reactions WHERE reaction='like'),
+       (SELECT COUNT(*) FROM feedback_reactions WHERE reaction='dislike')
+ON DUPLICATE KEY UPDATE
+    total_feedback=VALUES(total_feedback), total_likes=VALUES(total_likes), total_dislikes=VALUES(total_dislikes)
+""")
+cur.execute("""
 CREATE TABLE IF NOT EXISTS lesson_progress (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
@@ -177,8 +286,9 @@ CREATE TABLE IF NOT EXISTS lesson_progress (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 """)
-mydb.commit()
+_conn.commit()
 cur.close()
+database.release(_conn)
 
 @app.route('/')
 def home():
@@ -196,7 +306,7 @@ def login():
         password = request.form.get('password')
 
         try:
-            cursor = mydb.cursor(dictionary=True)
+            cursor = get_db().cursor(dictionary=True)
             cursor.execute("SELECT * FROM users WHERE name = %s AND password = %s", (name, password))
             user = cursor.fetchone()
             cursor.close()
@@ -246,7 +356,7 @@ def profile():
         return redirect('/login')
 
     user_id = session['user_id']
-    cur = mydb.cursor(dictionary=True)
+    cur = get_db().cursor(dictionary=True)
     cur.execute("SELECT name, email, date_of_birth, contact FROM users WHERE id = %s", (user_id,))
     user = cur.fetchone()
     cur.close()
@@ -290,7 +400,7 @@ def verify_edit():
 
         # For forgot password flow, find user by username instead of session
         if forgot_password and username_input:
-            cur = mydb.cursor(dictionary=True)
+            cur = get_db().cursor(dictionary=True)
             cur.execute("SELECT id, password, contact, email, date_of_birth FROM users WHERE name = %s", (username_input,))
             user_data = cur.fetchone()
             cur.close()
@@ -307,7 +417,7 @@ def verify_edit():
         else:
             user_id = session['user_id']
 
-            cur = mydb.cursor(dictionary=True)
+            cur = get_db().cursor(dictionary=True)
             cur.execute("SELECT password, contact, email, date_of_birth FROM users WHERE id = %s", (user_id,))
             user = cur.fetchone()
             cur.close()
@@ -422,7 +532,7 @@ def edit_profile():
         return redirect('/verify_edit')
 
     user_id = session['user_id']
-    cur = mydb.cursor(dictionary=True)
+    cur = get_db().cursor(dictionary=True)
     cur.execute("SELECT name, email, contact FROM users WHERE id = %s", (user_id,))
     user = cur.fetchone()
     cur.close()
@@ -466,9 +576,9 @@ def edit_profile():
         if update_fields:
             update_values.append(user_id)
             query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = %s"
-            cur = mydb.cursor()
+            cur = get_db().cursor()
             cur.execute(query, update_values)
-            mydb.commit()
+            get_db().commit()
             cur.close()
             
             # Clean up session flags
@@ -508,18 +618,78 @@ def register():
             flash("❌ Passwords do not match. Please try again.")
             return redirect('/register')
 
-        cur = mydb.cursor()
+        cur = get_db().cursor()
         cur.execute(
             "INSERT INTO users (name, password, contact, email, date_of_birth) VALUES (%s, %s, %s, %s, %s)",
             (full_name, password, contact, email, dob)
         )
-        mydb.commit()
+        get_db().commit()
         cur.close()
         flash("✅ Registered successfully. Please log in.")
         return redirect('/login')
 
     return render_template("register.html")
 
+FEEDBACK_PAGE_SIZE = int(os.getenv("FEEDBACK_PAGE_SIZE") or 20)
+
+def feedback_totals(cur):
+    """Global feedback/like/dislike totals from the maintained feedback_stats row"""
+    cur.execute("SELECT total_feedback, total_likes, total_dislikes FROM feedback_stats WHERE id=1")
+    row = cur.fetchone()
+    if row is None:
+        return {"total_feedback": 0, "total_likes": 0, "total_dislikes": 0}
+    if not isinstance(row, dict):
+        row = dict(zip(("total_feedback", "total_likes", "total_dislikes"), row))
+    return {key: int(value or 0) for key, value in row.items()}
+
+def load_feedback_totals():
+    with database.connection() as conn:
+        cur = conn.cursor()
+        try:
+            return feedback_totals(cur)
+        finally:
+            cur.close()
+
+# Reactions and new feedback are pushed to the "feedback" Socket.IO room; totals double as the /feedback_stats snapshot
+feedback_live = FeedbackBroadcaster(
+    socketio, load_feedback_totals,
+    interval=float(os.getenv("FEEDBACK_PUSH_INTERVAL") or 0.5),
+    max_age=float(os.getenv("FEEDBACK_SNAPSHOT_MAX_AGE") or 10),
+)
+
+def feedback_page(user_id, before=None, limit=FEEDBACK_PAGE_SIZE):
+    """One page of feedback, newest first, keyed on id; returns (rows, cursor for the next page or None)"""
+    params = [user_id]
+    where = ""
+    if before is not None:
+        where = "WHERE f.id < %s"
+        params.append(before)
+    params.append(limit + 1)
+
+    cur = get_db().cursor(dictionary=True)
+    cur.execute(f"""
+        SELECT f.id, f.first_name, f.last_name, f.feedback, f.likes, f.dislikes, f.submitted_at,
+               r.reaction AS user_reaction
+        FROM feedback f
+        LEFT JOIN feedback_reactions r ON r.feedback_id = f.id AND r.user_id = %s
+        {where}
+        ORDER BY f.id DESC
+        LIMIT %s
+    """, params)
+    feedbacks = cur.fetchall() or []
+    cur.close()
+
+    next_cursor = feedbacks[limit - 1]['id'] if len(feedbacks) > limit else None
+    feedbacks = feedbacks[:limit]
+    for f in feedbacks:
+        # Format datetime
+        if isinstance(f['submitted_at'], datetime):
+            f['submitted_at'] = f['submitted_at'].strftime("%Y-%m-%d %H:%M")
+        # Flags for frontend button highlighting
+        f['userLiked'] = f['user_reaction'] == 'like'
+        f['userDisliked'] = f['user_reaction'] == 'dislike'
+    return feedbacks, next_cursor
+
 @app.route('/submit_feedback', methods=['POST'])
 def submit_feedback():
     first_name = request.form.get('first_name') or request.form.get('feedback_name') or ''
@@ -529,17 +699,18 @@ def submit_feedback():
     if not first_name or not feedback_text:
         return jsonify(success=False, message="⚠️ Please provide your name and feedback.")
 
-    cur = mydb.cursor()
+    cur = get_db().cursor()
     cur.execute(
         "INSERT INTO feedback (first_name, last_name, feedback) VALUES (%s, %s, %s)",
         (first_name, last_name, feedback_text)
     )
-    mydb.commit()
     new_id = cur.lastrowid
+    cur.execute("UPDATE feedback_stats SET total_feedback = total_feedback + 1 WHERE id=1")
+    totals = feedback_totals(cur)
+    get_db().commit()
     cur.close()
 
-    return jsonify({
-        "success": True,
+    item = {
         "id": new_id,
         "first_name": first_name,
         "last_name": last_name,
@@ -547,53 +718,51 @@ def submit_feedback():
         "likes": 0,
         "dislikes": 0,
         "submitted_at": datetime.now().strftime("%Y-%m-%d %H:%M")
-    })
+    }
+    feedback_live.new_feedback(item, totals)
+    return jsonify({"success": True, **item})
 
 @app.route('/view_feedback')
 def view_feedback():
     if 'user_id' not in session:
         return redirect('/login')
 
-    user_id = session['user_id']
-
-    cur = mydb.cursor(dictionary=True)
-    cur.execute("""
-        SELECT f.id, f.first_name, f.last_name, f.feedback, 
-               (SELECT COUNT(*) FROM feedback_reactions r WHERE r.feedback_id=f.id AND r.reaction='like') AS likes,
-               (SELECT COUNT(*) FROM feedback_reactions r WHERE r.feedback_id=f.id AND r.reaction='dislike') AS dislikes,
-               f.submitted_at,
-               (SELECT reaction FROM feedback_reactions r WHERE r.feedback_id=f.id AND r.user_id=%s) AS user_reaction
-        FROM feedback f 
-        ORDER BY f.submitted_at DESC
-    """, (user_id,))
-    feedbacks = cur.fetchall() or []
-    cur.close()
+    feedbacks, next_cursor = feedback_page(session['user_id'])
+    stats = feedback_live.totals()
 
-    for f in feedbacks:
-        # Format datetime
-        if isinstance(f['submitted_at'], datetime):
-            f['submitted_at'] = f['submitted_at'].strftime("%Y-%m-%d %H:%M")
-        # Flags for frontend button highlighting
-        f['userLiked'] = f['user_reaction'] == 'like'
-        f['userDisliked'] = f['user_reaction'] == 'dislike'
+    return render_template('feedback.html', feedbacks=feedbacks, stats=stats, next_cursor=next_cursor,
+                           username=session.get('name'))
 
-    # Get total stats
-    cur = mydb.cursor()
-    cur.execute("SELECT COUNT(*) FROM feedback")
-    total_feedback = cur.fetchone()[0]
-    cur.execute("SELECT COUNT(*) FROM feedback_reactions WHERE reaction='like'")
-    total_likes = cur.fetchone()[0]
-    cur.execute("SELECT COUNT(*) FROM feedback_reactions WHERE reaction='dislike'")
-    total_dislikes = cur.fetchone()[0]
-    cur.close()
-
-    stats = {
-        "total_feedback": int(total_feedback or 0),
-        "total_likes": int(total_likes or 0),
-        "total_dislikes": int(total_dislikes or 0)
-    }
-
-    return render_template('feedback.html', feedbacks=feedbacks, stats=stats, username=session.get('name'))
+@app.route('/api/feedback')
+def feedback_list():
+    """Next page of feedback for the "load more" button: ?before=<id of the last card shown>"""
+    if 'user_id' not in session:
+        return jsonify(success=False, message="Login required"), 403
+    before = request.args.get('before', type=int)
+    feedbacks, next_cursor = feedback_page(session['user_id'], before)
+    return jsonify({"feedbacks": feedbacks, "next_cursor": next_cursor})
+
+REACTION_TOGGLE_SQL = """
+SET @prev = NULL;
+SELECT reaction INTO @prev FROM feedback_reactions
+WHERE feedback_id = %(feedback_id)s AND user_id = %(user_id)s FOR UPDATE;
+INSERT INTO feedback_reactions (feedback_id, user_id, reaction) VALUES (%(feedback_id)s, %(user_id)s, %(action)s) AS new
+ON DUPLICATE KEY UPDATE reaction = IF(feedback_reactions.reaction <=> new.reaction, NULL, new.reaction);
+SET @new = IF(@prev <=> %(action)s, NULL, %(action)s);
+UPDATE feedback f JOIN feedback_stats s ON s.id = 1
+SET f.likes = f.likes + (@new <=> 'like') - (@prev <=> 'like'),
+    f.dislikes = f.dislikes + (@new <=> 'dislike') - (@prev <=> 'dislike'),
+    s.total_likes = s.total_likes + (@new <=> 'like') - (@prev <=> 'like'),
+    s.total_dislikes = s.total_dislikes + (@new <=> 'dislike') - (@prev <=> 'dislike')
+WHERE f.id = %(feedback_id)s;
+SELECT f.likes, f.dislikes, s.total_feedback, s.total_likes, s.total_dislikes, CAST(@new AS CHAR)
+FROM feedback f JOIN feedback_stats s ON s.id = 1
+WHERE f.id = %(feedback_id)s
+"""
+# First reactions to the same feedback can deadlock on the gap lock taken by the locking read;
+# InnoDB rolls one of them back, and it is simply run again
+REACTION_RETRY_ERRNOS = (1213, 1205)  # ER_LOCK_DEADLOCK, ER_LOCK_WAIT_TIMEOUT
+REACTION_ATTEMPTS = 3
 
 @app.route('/react_feedback/<int:feedback_id>/<action>', methods=['POST'])
 def react_feedback(feedback_id, action):
@@ -604,149 +773,134 @@ def react_feedback(feedback_id, action):
     if action not in ("like", "dislike"):
         return jsonify(success=False, message="Invalid action"), 400
 
-    cur = mydb.cursor(dictionary=True)
-    # Check if user already reacted
-    cur.execute("SELECT reaction FROM feedback_reactions WHERE feedback_id=%s AND user_id=%s", (feedback_id, user_id))
-    existing = cur.fetchone()
-
-    if existing:
-        if existing['reaction'] == action:
-            # Undo reaction → delete record
-            cur.execute("DELETE FROM feedback_reactions WHERE feedback_id=%s AND user_id=%s", (feedback_id, user_id))
-        else:
-            # Switch reaction → update record
-            cur.execute("UPDATE feedback_reactions SET reaction=%s WHERE feedback_id=%s AND user_id=%s", (action, feedback_id, user_id))
-    else:
-        # Add new reaction
-        cur.execute("INSERT INTO feedback_reactions (feedback_id, user_id, reaction) VALUES (%s, %s, %s)", (feedback_id, user_id, action))
-
-    mydb.commit()
-
-    # Recalculate counts for this feedback
-    cur.execute("SELECT COUNT(*) AS likes FROM feedback_reactions WHERE feedback_id=%s AND reaction='like'", (feedback_id,))
-    likes = cur.fetchone()['likes']
-    cur.execute("SELECT COUNT(*) AS dislikes FROM feedback_reactions WHERE feedback_id=%s AND reaction='dislike'", (feedback_id,))
-    dislikes = cur.fetchone()['dislikes']
-
-    # Update feedback table for compatibility (optional)
-    cur.execute("UPDATE feedback SET likes=%s, dislikes=%s WHERE id=%s", (likes, dislikes, feedback_id))
-    mydb.commit()
-
-    # --- compute global totals from the reactions table ---
-    cur.execute("SELECT COUNT(*) AS total_feedback FROM feedback")
-    total_feedback = cur.fetchone()['total_feedback']
-    cur.execute("SELECT COUNT(*) AS total_likes FROM feedback_reactions WHERE reaction='like'")
-    total_likes = cur.fetchone()['total_likes']
-    cur.execute("SELECT COUNT(*) AS total_dislikes FROM feedback_reactions WHERE reaction='dislike'")
-    total_dislikes = cur.fetchone()['total_dislikes']
-
-    # --- return the current user's reaction for this feedback (after the change) ---
-    cur.execute("SELECT reaction FROM feedback_reactions WHERE feedback_id=%s AND user_id=%s", (feedback_id, user_id))
-    user_row = cur.fetchone()
-    user_reaction = user_row['reaction'] if user_row else None
+    db = get_db()
+    row = None
+    for attempt in range(REACTION_ATTEMPTS):
+        cur = db.cursor()
+        try:
+            # One round-trip: lock the user's reaction row, toggle it with an upsert, apply the change
+            # as deltas to the per-feedback counters and global totals, and read the new counts back
+            for result in cur.execute(REACTION_TOGGLE_SQL, {
+                "feedback_id": feedback_id, "user_id": user_id, "action": action,
+            }, multi=True):
+                if result.with_rows:
+                    row = result.fetchone()
+            db.commit()
+            break
+        except mysql.connector.IntegrityError:
+            db.rollback()
+            return jsonify(success=False, message="Feedback not found"), 404
+        except mysql.connector.Error as e:
+            db.rollback()
+            if e.errno not in REACTION_RETRY_ERRNOS or attempt == REACTION_ATTEMPTS - 1:
+                raise
+            row = None
+            time.sleep(0.02 * (attempt + 1))
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            cur.close()
 
-    cur.close()
+    if row is None:
+        return jsonify(success=False, message="Feedback not found"), 404
+    likes, dislikes, total_feedback, total_likes, total_dislikes, user_reaction = row
+    totals = {
+        "total_feedback": int(total_feedback or 0),
+        "total_likes": int(total_likes or 0),
+        "total_dislikes": int(total_dislikes or 0),
+    }
+    feedback_live.reaction(feedback_id, int(likes or 0), int(dislikes or 0), totals)
     return jsonify({
         "success": True,
         "likes": int(likes or 0),
         "dislikes": int(dislikes or 0),
-        "total_feedback": int(total_feedback or 0),
-        "total_likes": int(total_likes or 0),
-        "total_dislikes": int(total_dislikes or 0),
+        **totals,
         "user_reaction": user_reaction  # will be 'like' / 'dislike' / None
     })
 
 @app.route('/feedback_stats')
 @login_required
 def feedback_stats():
-    cur = mydb.cursor()
-    cur.execute("SELECT COUNT(*) FROM feedback")
-    total_feedback = cur.fetchone()[0]
-    cur.execute("SELECT COUNT(*) FROM feedback_reactions WHERE reaction='like'")
-    total_likes = cur.fetchone()[0]
-    cur.execute("SELECT COUNT(*) FROM feedback_reactions WHERE reaction='dislike'")
-    total_dislikes = cur.fetchone()[0]
-    cur.close()
-
-    return jsonify({
-        "total_feedback": int(total_feedback or 0),
-        "total_likes": int(total_likes or 0),
-        "total_dislikes": int(total_dislikes or 0)
-    })
+    return jsonify(feedback_live.totals())
+
+@app.route('/api/llm-stats')
+def llm_stats():
+    """Per-model in-flight, queued and rejected Ollama requests, response-cache hit rate and job queue counters"""
+    return jsonify({"models": ollama.stats(), "cache": llm_cache.stats(), "jobs": job_queue.stats(),
+                    "conversations": conversations.stats()})
+
+@app.route('/api/session-stats')
+def session_stats():
+    """Server-side session backend, stored sessions and load/save counts"""
+    return jsonify(session_store.stats() if session_store else {"backend": "cookie"})
+
+@app.route('/api/db-stats')
+def db_stats():
+    """Connection pool size, utilisation and checkout wait times"""
+    return jsonify(database.stats())
+
+def chatbot_conversation_id():
+    if 'chat_conversation_id' not in session:
+        session['chat_conversation_id'] = uuid.uuid4().hex
+    return session['chat_conversation_id']
+
+def chatbot_job_params(data):
+    """Chatbot job input carrying this session's server-side history; any client-sent history is ignored"""
+    user_message = (data.get('message') or '').strip()
+    conversation_id = chatbot_conversation_id()
+    return {'message': user_message, 'conversation_id': conversation_id,
+            'messages': conversations.window(conversation_id, user_message) if user_message else []}
 
 @app.route('/api/chatbot', methods=['POST'])
 def chatbot():
-    data = request.get_json()
-    user_message = data.get('message', '')
-    if not user_message:
+    data = request.get_json() or {}
+    if not data.get('message'):
         return jsonify({'error': 'No message provided'}), 400
 
-    # Initialize conversation history in session if not present
-    if 'conversation' not in session:
-        session['conversation'] = []
-
-    # Append user message to conversation history
-    session['conversation'].append({'role': 'user', 'content': user_message})
-
-    # Prepare messages payload for Ollama
-    messages = session['conversation']
+    try:
+        result = queued_llm('chatbot', chatbot_job_params(data))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LLMBusy as e:
+        return jsonify({'error': str(e)}), 503
+    except LLMError as e:
+        print(f"Ollama error: {e}")
+        return jsonify({'error': f'Failed to get response from Ollama: {str(e)}'}), 500
+    return jsonify(result)
+
+@app.route('/api/chatbot/reset', methods=['POST'])
+def chatbot_reset():
+    """Forget the current chatbot conversation"""
+    conversations.clear(chatbot_conversation_id())
+    return jsonify({'success': True})
 
-    ollama_url = 'http://localhost:11434/api/generate'
-    prompt = user_message
-    payload = {
-        'model': 'Sign_Setu',  # Use your custom mistral model name here
-        'prompt': prompt,
-        'stream': False
-    }
+# Path where alphabet and digit images are stored
+IMAGE_DIR = os.path.join("static", "images")
 
-    max_retries = 3
-    retry_delay = 1  # seconds
-    timeout_seconds = 120  # Increased timeout for slower hardware
+# Letter/digit glyphs indexed once (and re-checked every few seconds) with fingerprinted URLs
+glyph_index = GlyphIndex(
+    static_root="static",
+    atlas=(os.getenv("GLYPH_ATLAS") or "1") != "0",
+    refresh_interval=float(os.getenv("GLYPH_REFRESH_SECONDS") or 5),
+    socketio=socketio,
+)
 
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(ollama_url, json=payload, timeout=timeout_seconds)
-            response.raise_for_status()
-
-            # Parse streaming-safe response
-            output_text = ""
-            for line in response.text.strip().splitlines():
-                try:
-                    chunk = json.loads(line)
-                    output_text += chunk.get("response", "")
-                except:
-                    continue
-
-            # Clean up any markdown/code block markers
-            output_text = output_text.replace("```json", "").replace("```", "").strip()
-
-            # Try to parse final JSON if possible
-            try:
-                result_json = json.loads(output_text)
-                bot_reply = result_json.get("corrected") or result_json.get("reply") or output_text
-            except Exception:
-                bot_reply = output_text
-
-            if not bot_reply:
-                return jsonify({'error': 'No reply content from Ollama'}), 500
-
-            # Append bot reply to conversation history
-            session['conversation'].append({'role': 'assistant', 'content': bot_reply})
-            session.modified = True
-
-            return jsonify({'reply': bot_reply})
-        except requests.exceptions.RequestException as e:
-            print(f"Ollama error on attempt {attempt + 1}: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay)
-            else:
-                return jsonify({'error': f'Failed to get response from Ollama after {max_retries} attempts: {str(e)}'}), 500
-            # Clean up any markdown/code block markers
+# Video-call room membership per connection; shared through Redis when running several workers
+rooms = room_registry_from_env(socketio)
 
-# Path where alphabet and digit images are stored
-IMAGE_DIR = os.path.join("static", "images")
+@socketio.on('join-feedback')
+def on_join_feedback(data=None):
+    """Subscribe to live feedback counters; sends the current totals straight away"""
+    # Same rule as the HTTP feedback routes: logged-in users only
+    if 'user_id' not in session:
+        return {"error": "Login required"}
+    join_room(feedback_live.room)
+    emit('feedback-update', {"counts": {}, "new": [], "stats": feedback_live.totals()})
 
-rooms = {}  # room_id -> list of usernames
+@socketio.on('leave-feedback')
+def on_leave_feedback(data=None):
+    leave_room(feedback_live.room)
 
 @socketio.on('join')
 def on_join(data):
@@ -754,35 +908,41 @@ def on_join(data):
     room = data['room']
     join_room(room)
 
-    if room not in rooms:
-        rooms[room] = []
-    rooms[room].append(username)
+    existing_users = rooms.join(room, request.sid, username)
 
     # Notify existing users about the new user
     emit('user-joined', {'username': username, 'room': room}, room=room, include_self=False)
 
     # Send list of existing users to the new user
-    existing_users = [u for u in rooms[room] if u != username]
     if existing_users:
         emit('existing-users', {'users': existing_users, 'room': room})
 
-    print(f"{username} joined room {room}. Users now: {rooms[room]}")
+    print(f"{username} joined room {room}. Users now: {rooms.members(room)}")
 
 @socketio.on('leave')
 def on_leave(data):
-    username = data['username']
     room = data['room']
     leave_room(room)
-    if room in rooms and username in rooms[room]:
-        rooms[room].remove(username)
-
-        # Auto-delete room when it becomes empty
-        if not rooms[room]:
-            del rooms[room]
-            print(f"Room {room} deleted - no users remaining")
-
-    emit('user-left', {'username': username, 'room': room}, room=room)
-    print(f"{username} left room {room}. Users now: {rooms.get(room, [])}")
+    username, last = rooms.leave(room, request.sid)
+    if username is None:
+        username = data.get('username')
+        last = username not in rooms.members(room)
+
+    # Another tab of the same user is still in the call: keep the peers' connections up
+    if last:
+        emit('user-left', {'username': username, 'room': room}, room=room)
+    print(f"{username} left room {room}. Users now: {rooms.members(room)}")
+
+@socketio.on('disconnect')
+def on_disconnect():
+    # Closed tabs and dropped connections never send 'leave'; tell their rooms once a user's last tab is gone
+    for room, username in rooms.disconnect(request.sid):
+        emit('user-left', {'username': username, 'room': room}, room=room)
+
+@app.route('/api/room-stats')
+def room_stats():
+    """Video-call rooms, connections and members, with the busiest rooms' counts"""
+    return jsonify(rooms.stats())
 
 # Chat message handling
 @socketio.on('chat-message')
@@ -830,23 +990,77 @@ def get_images():
     image_files = []
 
     for char in input_text:
-        if char.isalpha():  # letters
-            filename = f"{char.upper()}.jpeg"
-        elif char.isdigit():  # digits
-            filename = f"{char}.jpeg"
-        elif char in [" ", ".", ",", "?"]:
+        if char in [" ", ".", ",", "?"]:
             # special chars handled by frontend
             image_files.append({'special': char})
             continue
-        else:
+        if not char.isalnum():
             continue  # ignore unsupported symbols
 
-        filepath = os.path.join(IMAGE_DIR, filename)
-        if os.path.exists(filepath):
-            image_files.append({'img': f"/static/images/{filename}"})
+        glyph = glyph_index.image(char)
+        if glyph is not None:
+            item = {'img': glyph['url'], 'char': char.upper()}
+            if glyph['sprite']:
+                item['sprite'] = glyph['sprite']
+            image_files.append(item)
 
     return jsonify({'images': image_files})
 
+@app.route('/glyph/<fingerprint>/<filename>')
+def glyph_file(fingerprint, filename):
+    """A glyph image/video by content fingerprint; the URL changes whenever the file does"""
+    path = glyph_index.path_for(fingerprint, filename)
+    if path is None:
+        abort(404)
+    response = send_file(path, conditional=True)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE
+    return response
+
+@app.route('/glyph-atlas/<fingerprint>.jpeg')
+def glyph_atlas(fingerprint):
+    atlas_bytes = glyph_index.atlas(f"/glyph-atlas/{fingerprint}.jpeg")
+    if atlas_bytes is None:
+        abort(404)
+    return Response(atlas_bytes, mimetype="image/jpeg", headers={'Cache-Control': IMMUTABLE_CACHE})
+
+# Whole-sentence sign videos stitched from the per-letter clips, cached on disk by content
+sign_video = SignVideoCompositor(
+    cache_dir=os.getenv("SIGN_VIDEO_CACHE_DIR") or os.path.join("cache", "sign_videos"),
+    max_cache_bytes=int(os.getenv("SIGN_VIDEO_CACHE_MB") or 512) * 1024 * 1024,
+    max_renders=int(os.getenv("SIGN_VIDEO_MAX_RENDERS") or 2),
+)
+
+@app.route('/sign_video', methods=['POST'])
+def compose_sign_video():
+    """Render (or fetch from cache) one video signing the whole input text"""
+    data = request.get_json() or {}
+    input_text = (data.get('input') or data.get('text') or '').strip()
+    if not input_text:
+        return jsonify({'error': 'No input provided'}), 400
+    try:
+        rendered = sign_video.compose(input_text)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if rendered is None:
+        return jsonify({'error': 'Nothing in the input can be signed'}), 400
+    filename, cached = rendered
+    return jsonify({'url': f"/sign_video/{filename}", 'cached': cached})
+
+@app.route('/sign_video/<filename>')
+def sign_video_file(filename):
+    """A rendered sentence video; supports Range requests for seeking and is cacheable forever"""
+    path = sign_video.cached_path(filename)
+    if path is None:
+        abort(404)
+    response = send_file(path, conditional=True)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE
+    return response
+
+@app.route('/api/sign-video-stats')
+def sign_video_stats():
+    """Sentence video cache size, hits, renders and evictions"""
+    return jsonify(sign_video.stats())
+
 @app.route("/grammar_correction", methods=["POST"])
 def grammar_correction():
     try:
@@ -855,42 +1069,10 @@ def grammar_correction():
         if not text:
             return jsonify({"error": "No input text"}), 400
 
-        prompt = (
-            f"Correct the grammar of this sentence:\n\n{text}\n\n"
-            "Respond ONLY in JSON format like this:\n"
-            '{ "corrected": "<corrected sentence>", "explanation": "<short explanation>" }'
-        )
-
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model": "gemma2:2b", "prompt": prompt}
-        )
-
-        if response.status_code != 200:
-            return jsonify({"error": f"Ollama error {response.status_code}"}), 500
-
-        # ---------------------------
-        # STREAM-SAFE PARSING
-        # ---------------------------
-        output_text = ""
-        for line in response.text.strip().splitlines():
-            try:
-                chunk = json.loads(line)
-                output_text += chunk.get("response", "")
-            except:
-                continue
-
-        # Clean up any Markdown or code block markers
-        output_text = output_text.replace("```json", "").replace("```", "").strip()
-
-        # Parse final JSON safely
-        try:
-            result = json.loads(output_text)
-        except Exception:
-            result = {"corrected": output_text, "explanation": "Could not parse JSON"}
-
-        return jsonify(result)
+        return jsonify(queued_llm("grammar", {"text": text}))
 
+    except LLMBusy as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -903,39 +1085,12 @@ def style_enhance():
         style = (data.get("style") or "").strip().lower()
         if not text:
             return jsonify({"error": "No input text"}), 400
-        allowed = {"formal", "professional", "persuasive", "casual", "poetic"}
-        if style not in allowed:
+        if style not in STYLE_ENHANCE_STYLES:
             return jsonify({"error": f"Unsupported style '{style}'"}), 400
 
-        # Build a controlled prompt for rewriting
-        prompt = (
-            f"Rewrite the following text in a {style} style, improving clarity and tone.\n"
-            f"Keep meaning intact and avoid adding extra information.\n\n"
-            f"Text:\n{text}\n\n"
-            "Respond ONLY in JSON like this (no extra keys):\n"
-            '{ "result": "<rewritten text>" }'
-        )
-
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model": "gemma2:2b", "prompt": prompt}
-        )
-        if response.status_code != 200:
-            return jsonify({"error": f"Ollama error {response.status_code}"}), 500
-
-        output_text = ""
-        for line in response.text.strip().splitlines():
-            try:
-                chunk = json.loads(line)
-                output_text += chunk.get("response", "")
-            except Exception:
-                continue
-        output_text = output_text.replace("```json", "").replace("```", "").strip()
-        try:
-            result = json.loads(output_text)
-        except Exception:
-            result = {"result": output_text}
-        return jsonify({"result": result.get("result", "").strip()})
+        return jsonify(queued_llm("style_enhance", {"text": text, "style": style}))
+    except LLMBusy as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -952,48 +1107,10 @@ def style_enhancement():
         if not style:
             return jsonify({"error": "No style selected"}), 400
 
-        prompt = (
-            f"Take the following sentence and rewrite it in the style of '{style}'.\n\n"
-            f"Sentence: {text}\n\n"
-            'Respond ONLY in JSON format like this:\n'
-            '{ "enhanced": "<sentence rewritten in selected style>" }'
-        )
-
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model": "gemma2:2b", "prompt": prompt}
-        )
-
-        if response.status_code != 200:
-            return jsonify({"error": f"Ollama error {response.status_code}"}), 500
-
-        # ---------------------------
-        # STREAM-SAFE PARSING
-        # ---------------------------
-        output_text = ""
-        for line in response.text.strip().splitlines():
-            try:
-                chunk = json.loads(line)
-                output_text += chunk.get("response", "")
-            except:
-                continue
-
-        # Clean up any Markdown/code block markers
-        output_text = output_text.replace("```json", "").replace("```", "").strip()
-
-        # Parse final JSON safely
-        try:
-            result = json.loads(output_text)
-        except Exception:
-            result = {"enhanced": output_text}
-
-        enhanced_text = result.get("enhanced", "")
-        # Remove any prefix like "Professional version:" or "Persuasive version:"
-        if ":" in enhanced_text:
-            enhanced_text = ":".join(enhanced_text.split(":")[1:]).strip()
-
-        return jsonify({"enhanced": enhanced_text})
+        return jsonify(queued_llm("style_enhancement", {"text": text, "style": style}))
 
+    except LLMBusy as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1045,113 +1162,122 @@ def text_to_sign():
 # Config
 # -------------------------
 MODEL_PATH = "models/best_m_train.pt"
-CONF_THRESHOLD = 0.3
-SPACE_AFTER = 3.5
-FULLSTOP_AFTER = 12
-STABLE_SIGN_SECONDS = 1.75
-COMMA_AFTER = 8
+# CONF_THRESHOLD and the sign hold/space/comma/full-stop timings live in detect_pipeline.py
 
 # -------------------------
 # Load model
 # -------------------------
-model = YOLO(MODEL_PATH)
+# Backend is one of torch / onnx / openvino / torchscript; exported artifacts are cached under models/exported
+INFER_BACKEND = (os.getenv("INFER_BACKEND") or "torch").lower()
+INFER_THREADS = int(os.getenv("INFER_THREADS") or 0) or None
+INFER_IMGSZ = int(os.getenv("INFER_IMGSZ") or 640)
+INFER_PARITY_DIR = os.getenv("INFER_PARITY_DIR")
+# onnx-int8 is calibrated on INFER_CALIB_DIR and refused if its top-1 agreement with FP32 on the
+# held-out INFER_PARITY_DIR drops too far (or if there is no held-out set to check it on)
+INFER_CALIB_DIR = os.getenv("INFER_CALIB_DIR")
+INFER_INT8_MIN_AGREEMENT = float(os.getenv("INFER_INT8_MIN_AGREEMENT") or 0.97)
+
+try:
+    if INFER_BACKEND == "onnx-int8":
+        require_held_out(INFER_PARITY_DIR, INFER_CALIB_DIR)
+    model = load_detector(MODEL_PATH, INFER_BACKEND, INFER_THREADS, INFER_IMGSZ, calib_dir=INFER_CALIB_DIR)
+    if INFER_BACKEND == "onnx-int8":
+        quant_report = compare_models(YOLO(MODEL_PATH), model, INFER_PARITY_DIR, INFER_IMGSZ)
+        print(f"INT8 top-1 agreement: {quant_report['top1_agreement']:.2%} on {quant_report['frames']} frames")
+        if quant_report["top1_agreement"] < INFER_INT8_MIN_AGREEMENT:
+            raise RuntimeError(f"INT8 top-1 agreement {quant_report['top1_agreement']:.2%} "
+                               f"is below {INFER_INT8_MIN_AGREEMENT:.2%}")
+    elif INFER_BACKEND != "torch" and INFER_PARITY_DIR:
+        parity = parity_check(YOLO(MODEL_PATH), model, INFER_PARITY_DIR, imgsz=INFER_IMGSZ)
+        if not parity["ok"]:
+            raise RuntimeError(f"parity check failed on {len(parity['mismatches'])}/{parity['frames']} frames")
+except Exception as _e:
+    if INFER_BACKEND == "torch":
+        raise
+    print(f"[WARN] {INFER_BACKEND} backend unavailable ({_e}); falling back to torch")
+    INFER_BACKEND = "torch"
+    model = load_detector(MODEL_PATH, INFER_BACKEND, INFER_THREADS, INFER_IMGSZ)
 CLASS_NAMES = model.names if isinstance(model.names, dict) else {i: n for i, n in enumerate(model.names)}
+NUM_CLASSES = max(CLASS_NAMES) + 1
+
+# Temporal smoothing of per-frame class scores: vote (default) / ema / off
+label_smoother = LabelSmoother(
+    NUM_CLASSES,
+    mode=(os.getenv("LABEL_SMOOTHING") or "vote").lower(),
+    window=int(os.getenv("LABEL_SMOOTHING_WINDOW") or 5),
+    alpha=float(os.getenv("LABEL_SMOOTHING_ALPHA") or 0.5),
+)
+
+# Frames from concurrent /detect calls are grouped into one forward pass
+INFER_MAX_BATCH = int(os.getenv("INFER_MAX_BATCH") or 8) if INFER_BACKEND in BATCHED_BACKENDS else 1
+INFER_MAX_WAIT_MS = float(os.getenv("INFER_MAX_WAIT_MS") or 10)
+inference_scheduler = InferenceScheduler(
+    model, max_batch=INFER_MAX_BATCH, max_wait_ms=INFER_MAX_WAIT_MS,
+    on_batch=(lambda frames, seconds: metrics.observe_forward(INFER_BACKEND, frames, seconds))
+    if metrics.enabled else None,
+)
+
+# Frames are decoded at reduced scale and letterboxed to the model input size before inference
+frame_preprocessor = FramePreprocessor(imgsz=INFER_IMGSZ, pool_size=INFER_MAX_BATCH * 2)
+
+# Optional skip-inference gate for near-identical consecutive frames (e.g. while a sign is held)
+motion_gate = MotionGate(
+    enabled=os.getenv("MOTION_GATE", "0") == "1",
+    threshold=float(os.getenv("MOTION_GATE_THRESHOLD") or 3.0),
+    max_reuse_seconds=float(os.getenv("MOTION_GATE_MAX_REUSE_SECONDS") or 0.5),
+)
+
+# Optional hand-region tracking: after a confident box, infer on a crop around it at a smaller size
+roi_tracker = RoiTracker(
+    enabled=os.getenv("ROI_TRACKING", "0") == "1" and INFER_BACKEND in BATCHED_BACKENDS,
+    imgsz=int(os.getenv("ROI_IMGSZ") or 320),
+    expand=float(os.getenv("ROI_EXPAND") or 1.8),
+    min_conf=float(os.getenv("ROI_MIN_CONF") or 0.5),
+    refresh_every=int(os.getenv("ROI_REFRESH_EVERY") or 15),
+)
+
+# A frame that waits longer than INFER_TIMEOUT seconds for the detector is answered with a 503
+detect_pipeline = DetectPipeline(frame_preprocessor, inference_scheduler, CLASS_NAMES, CONF_THRESHOLD,
+                                 label_smoother, motion_gate, roi_tracker,
+                                 infer_timeout=float(os.getenv("INFER_TIMEOUT") or 10))
 
 # -------------------------
-# Persistent state
+# Per-stream sign-to-text state
 # -------------------------
-char_buffer = deque(maxlen=256)
-sentence = ""
-hand_present = False
-last_label = None
-label_start_time = 0.0
-last_accepted_label = None
-last_accepted_time = 0.0
-ACCEPT_COOLDOWN = 0.0
-space_added = False
-comma_added = False
-fullstop_added = False
-last_hand_time = time.time()
-pause_detection = False  # <-- pause detection while user edits
-
-state_lock = threading.Lock()
+SIGN_SESSION_MAX = int(os.getenv("SIGN_SESSION_MAX") or 1024)
+SIGN_SESSION_IDLE_SECONDS = float(os.getenv("SIGN_SESSION_IDLE_SECONDS") or 900)
+
+sign_sessions = SignSessionRegistry(
+    SIGN_TIMINGS,
+    max_sessions=SIGN_SESSION_MAX,
+    idle_timeout=SIGN_SESSION_IDLE_SECONDS,
+)
 
 # -------------------------
 # Helper functions
 # -------------------------
-def flush_char_buffer_as_word():
-    global sentence
-    if char_buffer:
-        word = "".join(char_buffer)
-        if word:
-            word = word.replace(" ", "")
-            sentence += word
-        char_buffer.clear()
-
-def accept_token(token: str):
-    global sentence
-    if pause_detection:
-        return
-    if token == "SPACE":
-        flush_char_buffer_as_word()
-        sentence += " "
-        return
-    if token == "CLEAR":
-        sentence = ""
-        char_buffer.clear()
-        return
-    if len(token) > 1:
-        flush_char_buffer_as_word()
-        sentence += token
-        return
-    char_buffer.append(token)
-
-def pick_label_from_result(res):
-    try:
-        boxes = res.boxes
-        if boxes is None or len(boxes) == 0:
-            return None, None, None
-        confs = boxes.conf.cpu().numpy()
-        classes = boxes.cls.cpu().numpy().astype(int)
-        xyxy = boxes.xyxy.cpu().numpy()
-        best_i = int(np.argmax(confs))
-        conf = float(confs[best_i])
-        if conf < CONF_THRESHOLD:
-            return None, None, None
-        cls_idx = int(classes[best_i])
-        label = CLASS_NAMES.get(cls_idx, str(cls_idx))
-        x1, y1, x2, y2 = [float(v) for v in xyxy[best_i]]
-        return label, conf, (x1, y1, x2, y2)
-    except:
-        return None, None, None
-
-def format_sentence(raw_sentence):
-    raw_sentence = re.sub(r'\s+', ' ', raw_sentence.strip())
-    formatted = ""
-    capitalize_next = True
-    word_buffer = ""
-    for c in raw_sentence:
-        if c.isalpha():
-            word_buffer += c.lower()
-        else:
-            if word_buffer:
-                if capitalize_next:
-                    formatted += word_buffer[0].upper() + word_buffer[1:]
-                    capitalize_next = False
-                else:
-                    formatted += word_buffer
-                word_buffer = ""
-            formatted += c
-            if c in ".!?":
-                capitalize_next = True
-            else:
-                capitalize_next = False
-    if word_buffer:
-        if capitalize_next:
-            formatted += word_buffer[0].upper() + word_buffer[1:]
-        else:
-            formatted += word_buffer
-    return formatted
+def current_sign_session(stream_id=None):
+    """Resolve the caller's SignSession from X-Stream-Id / ?stream_id, else a per-browser id"""
+    stream_id = stream_id or request.headers.get("X-Stream-Id") or request.args.get("stream_id")
+    if not stream_id:
+        stream_id = session.get("sign_session_id")
+        if not stream_id:
+            stream_id = uuid.uuid4().hex
+            session["sign_session_id"] = stream_id
+    return sign_sessions.get(str(stream_id)[:64])
+
+def read_frame_bytes():
+    """Pull the encoded frame out of a /detect request: raw image body, multipart upload or JSON data URL"""
+    mimetype = request.mimetype
+    if mimetype.startswith("image/") or mimetype == "application/octet-stream":
+        return request.get_data(cache=False)
+    if mimetype == "multipart/form-data":
+        upload = request.files.get("image") or request.files.get("frame")
+        return upload.read() if upload else None
+    data = request.get_json(silent=True)
+    if not data or "image" not in data:
+        return None
+    return base64.b64decode(data["image"].split(",")[-1])
 
 # -------------------------
 # Routes
@@ -1160,171 +1286,109 @@ def format_sentence(raw_sentence):
 def index():
     return render_template("sign-to-text-fixed.html")
 
-@app.route("/detect", methods=["POST"])
-def detect():
-    global sentence, hand_present, last_label, label_start_time
-    global last_accepted_label, last_accepted_time
-    global space_added, fullstop_added, comma_added,last_hand_time, pause_detection
+def detect_frame(img_data, sign_session):
+    """Run one encoded frame through the model and the session's state machine.
 
-    data = request.json
-    if not data or "image" not in data:
-        return jsonify({"error": "No image"}), 400
+    Returns (payload, status) so the HTTP route and the Socket.IO channel share one code path.
+    """
+    if not metrics.enabled:
+        return detect_pipeline.run(img_data, sign_session)
+    timings = {}
+    started = time.perf_counter()
+    payload, status = detect_pipeline.run(img_data, sign_session, timings)
+    timings["total"] = time.perf_counter() - started
+    metrics.observe_detect(timings, status)
+    return payload, status
 
+@app.route("/detect", methods=["POST"])
+def detect():
     try:
-        img_data = base64.b64decode(data["image"].split(",")[1])
-        img = Image.open(io.BytesIO(img_data)).convert("RGB")
+        img_data = read_frame_bytes()
     except Exception as e:
         return jsonify({"error": f"bad image: {e}"}), 400
+    if not img_data:
+        return jsonify({"error": "No image"}), 400
 
-    results = model(img)
-    label, conf, bbox = pick_label_from_result(results[0])
-    now = time.time()
-    boxes = []
-
-    if bbox and label:
-        x1, y1, x2, y2 = bbox
-        boxes.append({"class": label, "conf": conf, "x1": int(x1), "y1": int(y1),
-                      "x2": int(x2), "y2": int(y2)})
-
-    with state_lock:
-        countdowns = {}
-
-        # Pause detection while editing
-        if pause_detection:
-            return jsonify({"boxes": boxes, "sentence": sentence, "countdowns": countdowns})
-
-        # ---- Hand detected ----
-        if label:
-            hand_present = True
-            last_hand_time = now
-            comma_added = False     
-            space_added = False
-            fullstop_added = False
-
-            if label != last_label:
-                last_label = label
-                label_start_time = now
-
-            elapsed = now - label_start_time
-            remaining = max(0.0, STABLE_SIGN_SECONDS - elapsed)
-            countdowns["hold"] = {"type": "hold", "label": label, "remaining": round(remaining, 2),
-                                  "duration": STABLE_SIGN_SECONDS}
-
-            if remaining <= 0:
-                if last_label and (last_accepted_label != last_label or
-                                   (now - last_accepted_time) >= ACCEPT_COOLDOWN):
-                    accept_token(last_label)
-                    flush_char_buffer_as_word()
-                    last_accepted_label = last_label
-                    last_accepted_time = now
-                last_label = None
-                label_start_time = 0.0
-
-        # ---- No hand detected ----
-        else:
-            elapsed = now - last_hand_time
-
-    # 1. COMMA countdown
-            if space_added and not comma_added:
-                remaining_comma = max(0.0, COMMA_AFTER - elapsed)
-                countdowns["comma"] = {
-            "type": "comma",
-            "remaining": round(remaining_comma, 2),
-            "duration": COMMA_AFTER
-        }
-                if elapsed >= COMMA_AFTER:
-                    sentence = sentence.rstrip() + ", "
-                    comma_added = True
-
-    # 2. SPACE countdown
-            elif hand_present and not space_added:
-                remaining_space = max(0.0, SPACE_AFTER - elapsed)
-                countdowns["space"] = {
-            "type": "space",
-            "remaining": round(remaining_space, 2),
-            "duration": SPACE_AFTER
-        }
-                if elapsed >= SPACE_AFTER:
-                    sentence += " "
-                    space_added = True
-
-    # 3. FULLSTOP countdown
-            elif space_added and not fullstop_added:
-                remaining_fullstop = max(0.0, FULLSTOP_AFTER - elapsed)
-                countdowns["fullstop"] = {
-            "type": "fullstop",
-            "remaining": round(remaining_fullstop, 2),
-            "duration": FULLSTOP_AFTER
-        }
-                if elapsed >= FULLSTOP_AFTER:
-                    sentence = sentence.rstrip() + ". "
-                    fullstop_added = True
-                    hand_present = False
-                    last_label = None
-
-    formatted_sentence = format_sentence(sentence.strip())
-    return jsonify({"boxes": boxes, "sentence": formatted_sentence, "countdowns": countdowns})
+    payload, status = detect_frame(img_data, current_sign_session())
+    return jsonify(payload), status
+
+@socketio.on('detect-frame')
+def on_detect_frame(data):
+    """Binary frame channel: accepts raw JPEG bytes (or {frame, stream_id}) and acks with the /detect payload"""
+    stream_id = None
+    if isinstance(data, dict):
+        stream_id = data.get("stream_id")
+        data = data.get("frame")
+    if not data:
+        return {"error": "No image"}
+    if isinstance(data, str):
+        try:
+            data = base64.b64decode(data.split(",")[-1])
+        except Exception as e:
+            return {"error": f"bad image: {e}"}
+
+    payload, _ = detect_frame(data, current_sign_session(stream_id))
+    return payload
 
 @app.route("/reset", methods=["POST"])
 def reset():
-    global sentence, char_buffer, hand_present, last_label, last_accepted_label, last_accepted_time
-    global space_added, fullstop_added, last_hand_time, pause_detection
-    with state_lock:
-        sentence = ""
-        char_buffer.clear()
-        hand_present = False
-        last_label = None
-        last_accepted_label = None
-        last_accepted_time = 0.0
-        space_added = False
-        fullstop_added = False
-        last_hand_time = time.time()
-        pause_detection = False
-    return jsonify({"ok": True, "sentence": sentence})
+    sign_session = current_sign_session()
+    with sign_session.lock:
+        sign_session.reset()
+    return jsonify({"ok": True, "sentence": ""})
 
 @app.route("/set_sentence", methods=["POST"])
 def set_sentence():
-    global sentence, pause_detection, last_label, label_start_time, last_accepted_label, last_accepted_time
-    global space_added, fullstop_added, hand_present
-
     data = request.json
     if not data or "sentence" not in data:
         return jsonify({"error": "no sentence provided"}), 400
 
-    with state_lock:
-        sentence = data["sentence"]
-        pause_detection = data.get("pause", True)
-
-        # Reset timers if detection is resumed
-        if not pause_detection:
-            last_label = None
-            label_start_time = time.time()
-            last_accepted_label = None
-            last_accepted_time = 0.0
-            space_added = False
-            fullstop_added = False
-            hand_present = False
+    sign_session = current_sign_session()
+    with sign_session.lock:
+        sign_session.set_sentence(data["sentence"], data.get("pause", True))
+        sentence = sign_session.sentence
 
     return jsonify({"ok": True, "sentence": sentence})
 
 @app.route("/resume_detection", methods=["POST"])
 def resume_detection():
-    global pause_detection, last_label, label_start_time, last_accepted_label, last_accepted_time
-    global space_added, fullstop_added, hand_present
-
-    with state_lock:
-        pause_detection = False
+    sign_session = current_sign_session()
+    with sign_session.lock:
+        sign_session.pause_detection = False
         # Reset timers and detection state
-        last_label = None
-        label_start_time = time.time()       # reset hold timer
-        last_accepted_label = None
-        last_accepted_time = 0.0
-        space_added = False
-        fullstop_added = False
-        hand_present = False
+        sign_session.resume()
 
     return jsonify({"ok": True})
 
+@app.route("/api/inference-stats")
+def inference_stats():
+    """Queue depth and batch-size counters for the /detect inference scheduler, plus gate/ROI hit rates"""
+    stats = inference_scheduler.stats()
+    stats["backend"] = INFER_BACKEND
+    stats["motion_gate"] = motion_gate.stats()
+    stats["roi_tracker"] = roi_tracker.stats()
+    return jsonify(stats)
+
+# Gauges are read only when /metrics is scraped
+metrics.gauge("signverse_rooms", "Video-call rooms with at least one connection", lambda: rooms.stats()["rooms"])
+metrics.gauge("signverse_room_connections", "Socket.IO connections in video-call rooms",
+              lambda: rooms.stats()["connections"])
+metrics.gauge("signverse_sign_sessions", "Sign-to-text stream sessions held by this worker", lambda: len(sign_sessions))
+metrics.gauge("signverse_server_sessions", "Server-side login sessions",
+              lambda: session_store.stats()["sessions"] if session_store else None)
+metrics.gauge("signverse_inference_queue_depth", "Frames waiting for the detector",
+              lambda: inference_scheduler.stats()["queue_depth"])
+metrics.gauge("signverse_db_connections_in_use", "Pooled MySQL connections checked out",
+              lambda: database.stats()["in_use"])
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition of this worker's metrics"""
+    if not metrics.enabled:
+        abort(404)
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
 @app.route("/set_confidence_threshold", methods=["POST"])
 def set_confidence_threshold():
     global CONF_THRESHOLD
@@ -1342,6 +1406,7 @@ def set_confidence_threshold():
 
         # Update the global confidence threshold
         CONF_THRESHOLD = confidence_threshold
+        detect_pipeline.conf_threshold = confidence_threshold
 
         return jsonify({
             "success": True,
@@ -1366,59 +1431,13 @@ def language_conversion():
         if not target_language:
             return jsonify({"error": "No target language specified"}), 400
 
-        # Define supported Indian languages
-        supported_languages = {
-            "hindi": "Hindi",
-            "bengali": "Bengali", 
-            "tamil": "Tamil",
-            "telugu": "Telugu",
-            "marathi": "Marathi",
-            "gujarati": "Gujarati",
-            "kannada": "Kannada",
-            "malayalam": "Malayalam",
-            "punjabi": "Punjabi",
-            "urdu": "Urdu"
-        }
-        
-        if target_language.lower() not in supported_languages:
+        if target_language.lower() not in SUPPORTED_LANGUAGES:
             return jsonify({"error": f"Unsupported language: {target_language}"}), 400
         
-        language_name = supported_languages[target_language.lower()]
-        
-        prompt = (
-            f"Translate the following English text to {language_name}:\n\n{text}\n\n"
-            "Respond ONLY in JSON format like this:\n"
-            '{ "translated": "<translated text>", "language": "' + language_name + '" }'
-        )
-
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model": "gemma2:2b", "prompt": prompt}
-        )
-
-        if response.status_code != 200:
-            return jsonify({"error": f"Ollama error {response.status_code}"}), 500
-
-        # STREAM-SAFE PARSING
-        output_text = ""
-        for line in response.text.strip().splitlines():
-            try:
-                chunk = json.loads(line)
-                output_text += chunk.get("response", "")
-            except:
-                continue
-
-        # Clean up any Markdown or code block markers
-        output_text = output_text.replace("```json", "").replace("```", "").strip()
-
-        # Parse final JSON safely
-        try:
-            result = json.loads(output_text)
-        except Exception:
-            result = {"translated": output_text, "language": language_name}
-
-        return jsonify(result)
+        return jsonify(queued_llm("translation", {"text": text, "language": target_language}))
 
+    except LLMBusy as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1430,44 +1449,184 @@ def gram_correction():
         if not text:
             return jsonify({"error": "No input text"}), 400
 
-        prompt = (
-            f"Correct the grammar of this sentence:\n\n{text}\n\n"
-            "Respond ONLY in JSON format like this:\n"
-            '{ "corrected": "<corrected sentence>", "explanation": "<short explanation>" }'
-        )
-
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model": "gemma2:2b", "prompt": prompt}
-        )
+        return jsonify(queued_llm("grammar", {"text": text}))
 
-        if response.status_code != 200:
-            return jsonify({"error": f"Ollama error {response.status_code}"}), 500
-
-        # ---------------------------
-        # STREAM-SAFE PARSING
-        # ---------------------------
-        output_text = ""
-        for line in response.text.strip().splitlines():
-            try:
-                chunk = json.loads(line)
-                output_text += chunk.get("response", "")
-            except:
-                continue
+    except LLMBusy as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # Clean up any Markdown or code block markers
-        output_text = output_text.replace("```json", "").replace("```", "").strip()
+@app.route("/process_sentence", methods=["POST"])
+def process_sentence():
+    """Grammar correction, optional style rewrite and optional translation of a signed sentence as one job.
 
-        # Parse final JSON safely
-        try:
-            result = json.loads(output_text)
-        except Exception:
-            result = {"corrected": output_text, "explanation": "Could not parse JSON"}
+    Mode "single" (default) asks for every stage in one generation and falls back to the
+    chained per-stage calls if the reply is missing a stage; "chain" always runs them in sequence.
+    """
+    try:
+        return jsonify(queued_llm("sentence", request.get_json() or {}))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LLMBusy as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify(result)
+# --------------------- QUEUED LLM JOBS ---------------------
+@app.route("/api/jobs", methods=["POST"])
+def submit_llm_job():
+    """Queue a chatbot/grammar/style/translation/sentence job; poll /api/jobs/<id> or watch it over Socket.IO"""
+    data = request.get_json() or {}
+    kind = (data.get("kind") or "").strip()
+    priority = data.get("priority") or default_priority(kind)
+    if priority not in PRIORITIES:
+        return jsonify({"error": f"Unsupported priority '{priority}'"}), 400
+    if kind == "chatbot":
+        data = dict(data, **chatbot_job_params(data))
+    try:
+        spec = describe_job(kind, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        record = job_queue.submit(spec, priority)
+    except LLMBusy as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(record), 200 if record["status"] == "done" else 202
 
+@app.route("/api/jobs/<job_id>")
+def llm_job_status(job_id):
+    try:
+        record = job_queue.get(job_id)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    if record is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(record)
+
+@socketio.on('watch-job')
+def on_watch_job(data):
+    """Join a job's room to receive its "llm-job" result; replies at once if it already finished"""
+    job_id = (data or {}).get('job_id')
+    if not job_id:
+        return
+    join_room(f"job:{job_id}")
+    record = job_queue.get(job_id)
+    if record is not None and record["status"] in ("done", "failed"):
+        emit('llm-job', record)
+
+# --------------------- STREAMING LLM ENDPOINTS ---------------------
+# Server-Sent Events: `token` events carry text as it is generated, then one `result`
+# event carries the same JSON the non-streaming endpoint returns (or an `error` event).
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def stream_llm(endpoint, model, prompt, shape, cache_key=None, messages=None, on_result=None):
+    """Stream a generation (or, with `messages`, a chat turn) as SSE; `on_result(result)` runs once it completes.
+
+    `endpoint` is the job kind the stream corresponds to, used as the metrics label.
+    """
+    cached = llm_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        return Response(sse_event("result", cached), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache"})
+    try:
+        if messages is not None:
+            tokens = ollama.stream_chat(model, messages, keep_alive=OLLAMA_KEEP_ALIVE, endpoint=endpoint)
+        else:
+            tokens = ollama.stream_generate(model, prompt, endpoint=endpoint)
+    except LLMBusy as e:
+        return jsonify({"error": str(e)}), 503
+    except LLMError as e:
+        return jsonify({"error": str(e)}), 500
+
+    def generate():
+        chunks = []
+        try:
+            for token in tokens:
+                chunks.append(token)
+                yield sse_event("token", {"token": token})
+            output_text = "".join(chunks)
+            result = shape(output_text)
+            if cache_key and parse_json_reply(output_text) is not None:
+                llm_cache.set(cache_key, result)
+            if on_result is not None:
+                on_result(result)
+            yield sse_event("result", result)
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+        finally:
+            tokens.close()
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/stream/chatbot", methods=["POST"])
+def stream_chatbot():
+    data = request.get_json() or {}
+    user_message = data.get('message', '')
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+    conversation_id = chatbot_conversation_id()
+    messages = conversations.window(conversation_id, user_message)
+
+    def remember(result):
+        if result.get("reply"):
+            conversations.append(conversation_id, messages[-1], {'role': 'assistant', 'content': result["reply"]})
+
+    return stream_llm("chatbot", CHATBOT_MODEL, user_message, lambda out: {"reply": shape_chatbot(out)},
+                      messages=messages, on_result=remember)
+
+@app.route("/stream/grammar_correction", methods=["POST"])
+@app.route("/stream/sentence_correction", methods=["POST"])
+def stream_grammar_correction():
+    data = request.get_json() or {}
+    text = (data.get("text") or "").strip()
+    if not text:
+        return jsonify({"error": "No input text"}), 400
+    return stream_llm("grammar", GRAMMAR_MODEL, grammar_prompt(text), shape_grammar,
+                      llm_cache.key(GRAMMAR_MODEL, "grammar", text))
+
+@app.route("/stream/style_enhance", methods=["POST"])
+def stream_style_enhance():
+    data = request.get_json() or {}
+    text = (data.get("text") or "").strip()
+    style = (data.get("style") or "").strip().lower()
+    if not text:
+        return jsonify({"error": "No input text"}), 400
+    if style not in STYLE_ENHANCE_STYLES:
+        return jsonify({"error": f"Unsupported style '{style}'"}), 400
+    return stream_llm("style_enhance", GRAMMAR_MODEL, style_prompt(text, style), shape_style,
+                      llm_cache.key(GRAMMAR_MODEL, "style_enhance", text, style))
+
+@app.route("/stream/style_enhancement", methods=["POST"])
+def stream_style_enhancement():
+    data = request.get_json() or {}
+    text = (data.get("text") or "").strip()
+    style = (data.get("style") or "").strip()
+    if not text:
+        return jsonify({"error": "No input text"}), 400
+    if not style:
+        return jsonify({"error": "No style selected"}), 400
+    return stream_llm("style_enhancement", GRAMMAR_MODEL, enhancement_prompt(text, style), shape_enhancement,
+                      llm_cache.key(GRAMMAR_MODEL, "style_enhancement", text, style))
+
+@app.route("/stream/language_conversion", methods=["POST"])
+def stream_language_conversion():
+    data = request.get_json() or {}
+    text = (data.get("text") or "").strip()
+    target_language = (data.get("language") or "").strip()
+    if not text:
+        return jsonify({"error": "No input text"}), 400
+    if not target_language:
+        return jsonify({"error": "No target language specified"}), 400
+    if target_language.lower() not in SUPPORTED_LANGUAGES:
+        return jsonify({"error": f"Unsupported language: {target_language}"}), 400
+    language_name = SUPPORTED_LANGUAGES[target_language.lower()]
+    return stream_llm("translation", GRAMMAR_MODEL, translation_prompt(text, language_name),
+                      lambda out: shape_translation(out, language_name),
+                      llm_cache.key(GRAMMAR_MODEL, "translation", text, language_name))
 
 # --------------------- LESSON PROGRESS API ---------------------
 @app.route('/api/lesson-progress/<int:lesson_number>', methods=['GET'])
@@ -1476,7 +1635,7 @@ def get_lesson_progress(lesson_number):
     """Get user's progress for a specific lesson"""
     try:
         user_id = session['user_id']
-        cur = mydb.cursor(dictionary=True)
+        cur = get_db().cursor(dictionary=True)
         cur.execute(
             "SELECT completed_until, is_completed FROM lesson_progress WHERE user_id = %s AND lesson_number = %s",
             (user_id, lesson_number)
@@ -1504,7 +1663,7 @@ def update_lesson_progress(lesson_number):
         completed_until = data.get('completed_until', 0)
         is_completed = data.get('is_completed', False)
         
-        cur = mydb.cursor()
+        cur = get_db().cursor()
         cur.execute(
             """
             INSERT INTO lesson_progress (user_id, lesson_number, completed_until, is_completed)
@@ -1516,7 +1675,7 @@ def update_lesson_progress(lesson_number):
             """,
             (user_id, lesson_number, completed_until, is_completed)
         )
-        mydb.commit()
+        get_db().commit()
         cur.close()
         
         return jsonify({"success": True, "message": "Progress updated successfully"})
@@ -1529,7 +1688,7 @@ def get_all_lesson_progress():
     """Get user's progress for all lessons"""
     try:
         user_id = session['user_id']
-        cur = mydb.cursor(dictionary=True)
+        cur = get_db().cursor(dictionary=True)
         cur.execute(
             "SELECT lesson_number, completed_until, is_completed FROM lesson_progress WHERE user_id = %s ORDER BY lesson_number",
             (user_id,)
@@ -0,0 +1,154 @@
+"""Optimized inference backends for the sign detector.
+
+The PyTorch weights are exported once per (weights hash, format, input size) and the
+artifact is cached on disk, so later startups just load it. Exported backends can be
+checked against eager PyTorch on a directory of fixture frames before they are used.
+
+    python backends.py --backend onnx --fixtures tests/fixtures/frames
+"""
+import argparse
+import hashlib
+import os
+import shutil
+
+import numpy as np
+from ultralytics import YOLO
+
+BACKENDS = ("torch", "onnx", "onnx-int8", "openvino", "torchscript")
+# Backends whose exported graph accepts a variable batch dimension
+BATCHED_BACKENDS = {"torch", "onnx", "onnx-int8", "openvino"}
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def weights_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def export_artifact(weights, backend, imgsz=640, cache_dir="models/exported"):
+    """Export `weights` to `backend` unless a cached artifact for the same weights already exists"""
+    key = f"{weights_hash(weights)}-{backend}-{imgsz}"
+    target_dir = os.path.join(cache_dir, key)
+    marker = os.path.join(target_dir, "ARTIFACT")
+    if os.path.exists(marker):
+        with open(marker) as f:
+            return os.path.join(target_dir, f.read().strip())
+
+    os.makedirs(target_dir, exist_ok=True)
+    local_weights = os.path.join(target_dir, os.path.basename(weights))
+    shutil.copyfile(weights, local_weights)
+    artifact = YOLO(local_weights).export(
+        format=backend,
+        imgsz=imgsz,
+        dynamic=backend in BATCHED_BACKENDS,
+    )
+    os.remove(local_weights)
+    with open(marker, "w") as f:
+        f.write(os.path.relpath(artifact, target_dir))
+    return str(artifact)
+
+
+def _set_threads(model, source, backend, threads):
+    """Apply an intra-op thread count to the runtime underneath an Ultralytics model"""
+    import torch
+    torch.set_num_threads(threads)
+
+    inner = getattr(getattr(model, "predictor", None), "model", None)
+    if backend in ("onnx", "onnx-int8") and getattr(inner, "session", None) is not None:
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        inner.session = ort.InferenceSession(source, sess_options=opts,
+                                             providers=["CPUExecutionProvider"])
+    elif backend == "openvino" and getattr(inner, "ov_compiled_model", None) is not None:
+        import openvino as ov
+        # Recompile from the exported IR; the compiled model's runtime graph can't be compiled again
+        xml = source
+        if os.path.isdir(xml):
+            xml = next(os.path.join(source, n) for n in sorted(os.listdir(source)) if n.endswith(".xml"))
+        core = ov.Core()
+        ov_model = core.read_model(model=xml, weights=os.path.splitext(xml)[0] + ".bin")
+        if ov_model.get_parameters()[0].get_layout().empty:
+            ov_model.get_parameters()[0].set_layout(ov.Layout("NCHW"))
+        inner.ov_compiled_model = core.compile_model(
+            ov_model, device_name="CPU",
+            config={"PERFORMANCE_HINT": "THROUGHPUT", "INFERENCE_NUM_THREADS": threads},
+        )
+
+
+def load_detector(weights, backend="torch", threads=None, imgsz=640, cache_dir="models/exported", calib_dir=None):
+    """Load the detector on the requested backend, exporting and caching it on first use.
+
+    `calib_dir` is only used by the onnx-int8 backend (see quantize.py).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+
+    if backend == "torch":
+        source = weights
+        model = YOLO(source)
+    elif backend == "onnx-int8":
+        from quantize import quantized_artifact
+        source = quantized_artifact(weights, calib_dir, imgsz, cache_dir)
+        model = YOLO(source, task="detect")
+    else:
+        source = export_artifact(weights, backend, imgsz, cache_dir)
+        model = YOLO(source, task="detect")
+
+    # Build the predictor (and the backend session) now rather than on the first request
+    model(np.full((imgsz, imgsz, 3), 114, dtype=np.uint8), imgsz=imgsz, verbose=False)
+    if threads:
+        _set_threads(model, source, backend, int(threads))
+    return model
+
+
+def _top_pick(result):
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return None, 0.0
+    confs = boxes.conf.cpu().numpy()
+    best = int(np.argmax(confs))
+    return int(boxes.cls.cpu().numpy()[best]), float(confs[best])
+
+
+def parity_check(reference, candidate, fixture_dir, conf_tol=0.05, imgsz=640):
+    """Compare top label and confidence of `candidate` against `reference` on every fixture frame"""
+    import cv2
+
+    files = sorted(f for f in os.listdir(fixture_dir) if f.lower().endswith(IMAGE_EXTS))
+    mismatches = []
+    for name in files:
+        img = cv2.imread(os.path.join(fixture_dir, name))
+        if img is None:
+            continue
+        ref_cls, ref_conf = _top_pick(reference(img, imgsz=imgsz, verbose=False)[0])
+        cand_cls, cand_conf = _top_pick(candidate(img, imgsz=imgsz, verbose=False)[0])
+        if ref_cls != cand_cls or abs(ref_conf - cand_conf) > conf_tol:
+            mismatches.append({"file": name, "expected": [ref_cls, round(ref_conf, 4)],
+                               "got": [cand_cls, round(cand_conf, 4)]})
+    return {"frames": len(files), "mismatches": mismatches, "ok": not mismatches}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the sign detector and check it against PyTorch")
+    parser.add_argument("--weights", default="models/best_m_train.pt")
+    parser.add_argument("--backend", choices=BACKENDS, required=True)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--cache-dir", default="models/exported")
+    parser.add_argument("--fixtures", help="Directory of sample frames for the parity check")
+    parser.add_argument("--conf-tol", type=float, default=0.05)
+    args = parser.parse_args()
+
+    detector = load_detector(args.weights, args.backend, args.threads, args.imgsz, args.cache_dir)
+    print(f"Loaded {args.backend} backend")
+    if args.fixtures:
+        report = parity_check(YOLO(args.weights), detector, args.fixtures, args.conf_tol, args.imgsz)
+        print(f"Parity: {report['frames'] - len(report['mismatches'])}/{report['frames']} frames match")
+        for m in report["mismatches"]:
+            print("  mismatch:", m)
+        raise SystemExit(0 if report["ok"] else 1)
@@ -0,0 +1,303 @@
+"""Replay recorded frame sequences through /detect and report where the time goes.
+
+Each sub-directory of `--fixtures` is one recorded sequence of JPEG frames (sorted by
+name); a directory holding the frames directly is a single sequence. `--concurrency`
+streams replay the sequences round-robin, each with its own sign session, at `--fps`
+frames per second (0 = as fast as possible).
+
+By default the frames run in-process through the same DetectPipeline the route uses, so
+no MySQL, Ollama or network is needed, and each stage (decode, preprocess, inference,
+pick_label, state, format) is timed. With `--url` they are POSTed to a running server
+instead and only the round trip is timed.
+
+    python bench_detect.py --fixtures recordings/ --concurrency 4 --fps 10 --report detect_bench.json
+    python bench_detect.py --fixtures recordings/ --baseline detect_bench.json --max-regression 0.15
+
+Recordings are not committed; extract one from any clip, e.g.
+`ffmpeg -i clip.mp4 -vf fps=10 recordings/clip/%05d.jpg`.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import threading
+import time
+
+import numpy as np
+
+from backends import BACKENDS, BATCHED_BACKENDS, IMAGE_EXTS, load_detector
+from detect_pipeline import CONF_THRESHOLD, SIGN_TIMINGS, STAGES, DetectPipeline
+from inference import InferenceScheduler
+from motion_gate import MotionGate
+from preprocess import FramePreprocessor
+from roi_tracker import RoiTracker
+from sign_session import SignSession
+from smoothing import LabelSmoother
+
+
+def load_sequences(root):
+    """[(name, [jpeg bytes, ...]), ...] read fully into memory so disk I/O is not measured"""
+    def frames_in(directory):
+        names = sorted(n for n in os.listdir(directory) if n.lower().endswith(IMAGE_EXTS))
+        frames = []
+        for name in names:
+            with open(os.path.join(directory, name), "rb") as f:
+                frames.append(f.read())
+        return frames
+
+    sequences = []
+    for entry in sorted(os.scandir(root), key=lambda e: e.name):
+        if entry.is_dir():
+            frames = frames_in(entry.path)
+            if frames:
+                sequences.append((entry.name, frames))
+    if not sequences:
+        frames = frames_in(root)
+        if frames:
+            sequences.append((os.path.basename(os.path.normpath(root)), frames))
+    if not sequences:
+        raise SystemExit(f"No {'/'.join(IMAGE_EXTS)} frames under {root}")
+    return sequences
+
+
+def build_pipeline(args):
+    model = load_detector(args.weights, args.backend, args.threads, args.imgsz)
+    class_names = model.names if isinstance(model.names, dict) else {i: n for i, n in enumerate(model.names)}
+    max_batch = args.max_batch if args.backend in BATCHED_BACKENDS else 1
+    scheduler = InferenceScheduler(model, max_batch=max_batch, max_wait_ms=args.max_wait_ms)
+    pipeline = DetectPipeline(
+        FramePreprocessor(imgsz=args.imgsz, pool_size=max_batch * 2),
+        scheduler,
+        class_names,
+        CONF_THRESHOLD,
+        LabelSmoother(max(class_names) + 1, mode=args.smoothing),
+        MotionGate(enabled=args.motion_gate),
+        RoiTracker(enabled=args.roi and args.backend in BATCHED_BACKENDS),
+    )
+    return pipeline, scheduler
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ms = np.asarray(values, dtype=np.float64) * 1000.0
+    return {
+        "count": len(values),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+
+
+class Replay:
+    """Replays frames from `concurrency` streams and collects per-frame latencies"""
+
+    def __init__(self, sequences, concurrency, fps, loops, send):
+        self.sequences = sequences
+        self.concurrency = concurrency
+        self.fps = fps
+        self.loops = loops
+        self.send = send
+        self._lock = threading.Lock()
+        self.samples = {stage: [] for stage in ("total",) + STAGES}
+        self.statuses = {}
+        self.late_frames = 0
+
+    def _stream(self, index):
+        name, frames = self.sequences[index % len(self.sequences)]
+        stream_id = f"bench-{index}-{name}"
+        interval = 1.0 / self.fps if self.fps else 0.0
+        started = time.perf_counter()
+        sent = 0
+        for _ in range(self.loops):
+            for frame in frames:
+                if interval:
+                    delay = started + sent * interval - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    elif delay < -interval:
+                        with self._lock:
+                            self.late_frames += 1
+                timings = {}
+                t0 = time.perf_counter()
+                status = self.send(frame, stream_id, timings)
+                timings["total"] = time.perf_counter() - t0
+                sent += 1
+                with self._lock:
+                    self.statuses[status] = self.statuses.get(status, 0) + 1
+                    for stage, seconds in timings.items():
+                        self.samples[stage].append(seconds)
+
+    def run(self):
+        threads = [threading.Thread(target=self._stream, args=(i,), name=f"replay-{i}", daemon=True)
+                   for i in range(self.concurrency)]
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - wall, time.process_time() - cpu
+
+
+def in_process_sender(pipeline):
+    sessions = {}
+    lock = threading.Lock()
+
+    def send(frame, stream_id, timings):
+        with lock:
+            sess = sessions.get(stream_id)
+            if sess is None:
+                sess = sessions[stream_id] = SignSession(stream_id, SIGN_TIMINGS)
+        _, status = pipeline.run(frame, sess, timings)
+        return status
+
+    return send
+
+
+def http_sender(url, timeout):
+    import requests
+    local = threading.local()
+    endpoint = url.rstrip("/") + "/detect"
+
+    def send(frame, stream_id, timings):
+        http = getattr(local, "session", None)
+        if http is None:
+            http = local.session = requests.Session()
+        try:
+            response = http.post(endpoint, data=frame, timeout=timeout,
+                                 headers={"Content-Type": "image/jpeg", "X-Stream-Id": stream_id})
+            return response.status_code
+        except requests.RequestException:
+            return "error"
+
+    return send
+
+
+def compare(report, baseline, tolerance):
+    """Stage p95s and frames/sec/core that got worse than `baseline` by more than `tolerance`"""
+    regressions = []
+    for stage, current in report["latency"].items():
+        before = baseline.get("latency", {}).get(stage)
+        if current and before and before["p95_ms"] > 0 and current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{stage} p95 {before['p95_ms']} -> {current['p95_ms']} ms")
+    before = baseline.get("throughput", {}).get("frames_per_sec_per_core")
+    current = report["throughput"]["frames_per_sec_per_core"]
+    if before and current < before * (1 - tolerance):
+        regressions.append(f"frames/sec/core {before} -> {current}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded frame sequences through /detect")
+    parser.add_argument("--fixtures", required=True, help="Directory of recorded JPEG sequences")
+    parser.add_argument("--concurrency", type=int, default=1, help="Streams replayed in parallel")
+    parser.add_argument("--fps", type=float, default=0.0, help="Frames per second per stream (0 = unthrottled)")
+    parser.add_argument("--loops", type=int, default=1, help="Times each stream replays its sequence")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed frames run first")
+    parser.add_argument("--url", help="Benchmark a running server (e.g. http://localhost:5001) instead")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--weights", default="models/best_m_train.pt")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--smoothing", choices=("vote", "ema", "off"), default="vote")
+    parser.add_argument("--motion-gate", action="store_true")
+    parser.add_argument("--roi", action="store_true")
+    parser.add_argument("--report", help="Write the JSON report to this path")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="Allowed relative slowdown against --baseline before exiting non-zero")
+    args = parser.parse_args()
+
+    sequences = load_sequences(args.fixtures)
+    rss_before_model = max_rss_mb()
+    scheduler = None
+    if args.url:
+        send = http_sender(args.url, args.timeout)
+    else:
+        pipeline, scheduler = build_pipeline(args)
+        send = in_process_sender(pipeline)
+    warmup_frames = [f for _, frames in sequences for f in frames][:args.warmup]
+    for frame in warmup_frames:
+        send(frame, "bench-warmup", {})
+    rss_after_warmup = max_rss_mb()
+
+    replay = Replay(sequences, max(1, args.concurrency), args.fps, max(1, args.loops), send)
+    wall, cpu = replay.run()
+    frames = len(replay.samples["total"])
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+
+    report = {
+        "mode": "http" if args.url else "in-process",
+        "config": {
+            "url": args.url,
+            "backend": None if args.url else args.backend,
+            "weights": None if args.url else args.weights,
+            "imgsz": args.imgsz,
+            "threads": args.threads,
+            "concurrency": args.concurrency,
+            "fps": args.fps,
+            "loops": args.loops,
+            "smoothing": args.smoothing,
+            "motion_gate": args.motion_gate,
+            "roi": args.roi,
+            "sequences": {name: len(frames) for name, frames in sequences},
+        },
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cores": cores,
+        },
+        "latency": {stage: percentiles(values) for stage, values in replay.samples.items() if values},
+        "throughput": {
+            "frames": frames,
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(cpu, 3),
+            "frames_per_sec": round(frames / wall, 2) if wall else 0.0,
+            "frames_per_sec_per_core": round(frames / wall / cores, 3) if wall else 0.0,
+            # Frames per second of CPU actually burned; steadier than the wall-clock figure on a shared box
+            "frames_per_cpu_sec": round(frames / cpu, 3) if cpu else 0.0,
+            "late_frames": replay.late_frames,
+            "statuses": {str(k): v for k, v in sorted(replay.statuses.items(), key=lambda kv: str(kv[0]))},
+        },
+        "memory": {
+            "max_rss_mb_before_model": rss_before_model,
+            "max_rss_mb_after_warmup": rss_after_warmup,
+            "max_rss_mb": max_rss_mb(),
+        },
+    }
+    if scheduler is not None:
+        report["scheduler"] = scheduler.stats()
+
+    for stage, stats in report["latency"].items():
+        print(f"{stage:>10}: p50 {stats['p50_ms']:>9} ms  p95 {stats['p95_ms']:>9} ms  p99 {stats['p99_ms']:>9} ms")
+    print(f"{frames} frames in {report['throughput']['wall_seconds']} s: "
+          f"{report['throughput']['frames_per_sec']} frames/s, "
+          f"{report['throughput']['frames_per_sec_per_core']} frames/s/core, "
+          f"max RSS {report['memory']['max_rss_mb']} MB")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        report["regressions"] = regressions
+
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    for r in regressions:
+        print("  regression:", r)
+    raise SystemExit(1 if regressions else 0)
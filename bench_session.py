@@ -0,0 +1,122 @@
+"""Compare cookie and server-side sessions on a /detect-style request.
+
+Seeds each backend with a representative logged-in session, then replays small /detect
+POSTs and reports the Cookie header size clients send and the time Flask spends opening
+and saving the session per request.
+
+    python bench_session.py --requests 2000 --turns 10 --report session_bench.json
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+import uuid
+
+from flask import Flask, request, session
+
+from server_session import init_server_session
+
+
+def representative_session(turns):
+    """What a logged-in user's session held with the old cookie-stored chatbot history"""
+    data = {
+        "user_id": 42,
+        "name": "Example User",
+        "verified": True,
+        "forgot_password_flow": False,
+        "sign_session_id": uuid.uuid4().hex,
+        "chat_conversation_id": uuid.uuid4().hex,
+    }
+    if turns:
+        data["conversation"] = [
+            {"role": role, "content": f"{role} message {i} about learning the sign for a letter or number."}
+            for i in range(turns) for role in ("user", "assistant")
+        ]
+    return data
+
+
+def build_app(backend, directory, payload):
+    app = Flask(__name__)
+    app.secret_key = "bench-secret"
+    init_server_session(app, backend, directory=directory, sweep_interval=0)
+
+    @app.route("/seed", methods=["POST"])
+    def seed():
+        session.update(payload)
+        return "", 204
+
+    @app.route("/detect", methods=["POST"])
+    def detect():
+        # Same session use as the real route: read the sign-session id, write nothing
+        session.get("sign_session_id")
+        return "", 204
+
+    return app
+
+
+def bench_backend(backend, requests, payload, directory):
+    app = build_app(backend, directory, payload)
+    client = app.test_client()
+    client.post("/seed")
+    cookie = client.get_cookie(app.config["SESSION_COOKIE_NAME"])
+    cookie_header = f"{cookie.key}={cookie.value}"
+
+    frame = b"\xff\xd8" + b"\0" * 8192  # stand-in for a small JPEG body
+    interface = app.session_interface
+    open_seconds = 0.0
+    save_seconds = 0.0
+    for _ in range(requests):
+        with app.test_request_context("/detect", method="POST", data=frame,
+                                      headers={"Cookie": cookie_header, "Content-Type": "image/jpeg"}):
+            started = time.perf_counter()
+            sess = interface.open_session(app, request)
+            opened = time.perf_counter()
+            sess.get("sign_session_id")
+            response = app.response_class("", 204)
+            interface.save_session(app, sess, response)
+            open_seconds += opened - started
+            save_seconds += time.perf_counter() - opened
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.post("/detect", data=frame, headers={"Content-Type": "image/jpeg"})
+    round_trip = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "cookie_bytes": len(cookie_header),
+        "open_us": round(open_seconds / requests * 1e6, 2),
+        "save_us": round(save_seconds / requests * 1e6, 2),
+        "request_us": round(round_trip / requests * 1e6, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cookie vs server-side sessions on /detect")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=10, help="Chatbot turns in the seeded session")
+    parser.add_argument("--backends", nargs="+", default=["cookie", "memory", "filesystem"])
+    parser.add_argument("--report", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    payload = representative_session(args.turns)
+    directory = tempfile.mkdtemp(prefix="signverse-sessions-")
+    try:
+        results = [bench_backend(b, args.requests, payload, directory) for b in args.backends]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    baseline = next((r for r in results if r["backend"] == "cookie"), None)
+    for r in results:
+        if baseline is not None and r is not baseline:
+            r["cookie_bytes_saved"] = baseline["cookie_bytes"] - r["cookie_bytes"]
+            r["open_us_saved"] = round(baseline["open_us"] - r["open_us"], 2)
+        print(f"{r['backend']:>10}: cookie {r['cookie_bytes']:>5} B, open {r['open_us']:>8} us, "
+              f"save {r['save_us']:>8} us, request {r['request_us']:>9} us")
+
+    report = {"requests": args.requests, "turns": args.turns, "results": results}
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_tokens(text):
+    """Rough token count for budgeting (~3 characters per token, plus per-message overhead)"""
+    return len(text) // 3 + 4
+
+
+class ConversationStore:
+    """Server-side chatbot histories, keyed by a conversation id kept in the session cookie.
+
+    Histories live in an optional Redis tier shared by all web and job workers, which is
+    always read first so turns appended elsewhere are seen; the in-process LRU (at most
+    `max_conversations`, dropped after `idle_ttl` seconds) is the store without Redis and
+    the fallback while Redis is unreachable. Each history is trimmed to
+    `max_tokens` when stored, and `window()` picks the newest turns that fit the model's
+    context (`context_tokens` minus `reserve_tokens` for the system prompt and the reply).
+    """
+
+    def __init__(self, max_conversations=1024, idle_ttl=3600, context_tokens=1024, reserve_tokens=384,
+                 max_tokens=2048, redis_url=None, prefix="signverse:conv:"):
+        self.max_conversations = max_conversations
+        self.idle_ttl = idle_ttl
+        self.context_tokens = context_tokens
+        self.reserve_tokens = reserve_tokens
+        self.max_tokens = max_tokens
+        self.prefix = prefix
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.trimmed_messages = 0
+        self.redis = None
+        if redis_url:
+            try:
+                import redis
+                self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.2, socket_connect_timeout=0.2)
+                self.redis.ping()
+            except Exception as e:
+                print("[WARN] Conversation store Redis tier disabled:", e)
+                self.redis = None
+
+    def history(self, conversation_id):
+        now = time.time()
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(self.prefix + conversation_id)
+            except Exception:
+                raw = False  # Redis unreachable: fall back to this worker's copy
+            if raw is not False:
+                messages = None
+                if raw is not None:
+                    try:
+                        messages = json.loads(raw)
+                    except ValueError:
+                        # Corrupt or foreign value under our key: treat it as a miss
+                        messages = None
+                if messages is None:
+                    with self._lock:
+                        self._entries.pop(conversation_id, None)
+                    return []
+                self._store_local(conversation_id, messages, now)
+                return list(messages)
+
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None:
+                last_used, messages = entry
+                if now - last_used <= self.idle_ttl:
+                    self._entries[conversation_id] = (now, messages)
+                    self._entries.move_to_end(conversation_id)
+                    return list(messages)
+                del self._entries[conversation_id]
+        return []
+
+    def append(self, conversation_id, *messages):
+        history = self.history(conversation_id) + list(messages)
+        history = self._trim(history, self.max_tokens)
+        self._store_local(conversation_id, history, time.time())
+        if self.redis is not None:
+            try:
+                self.redis.set(self.prefix + conversation_id, json.dumps(history), ex=self.idle_ttl)
+            except Exception:
+                pass
+
+    def clear(self, conversation_id):
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+        if self.redis is not None:
+            try:
+                self.redis.delete(self.prefix + conversation_id)
+            except Exception:
+                pass
+
+    def window(self, conversation_id, user_message):
+        """Messages to send for the next turn: the newest history that fits the context, then `user_message`"""
+        budget = self.context_tokens - self.reserve_tokens
+        message = {"role": "user", "content": user_message}
+        if estimate_tokens(user_message) > budget:
+            # A single oversized message keeps its tail, which is usually the actual question
+            message["content"] = user_message[-(budget - 4) * 3:]
+            return [message]
+        return self._trim(self.history(conversation_id), budget - estimate_tokens(message["content"])) + [message]
+
+    def _trim(self, messages, budget):
+        """Drop the oldest turns until the rest fits `budget` tokens; never start on an assistant reply"""
+        total = sum(estimate_tokens(m["content"]) for m in messages)
+        start = 0
+        while start < len(messages) and (total > budget or messages[start]["role"] != "user"):
+            total -= estimate_tokens(messages[start]["content"])
+            start += 1
+        if start:
+            with self._lock:
+                self.trimmed_messages += start
+        return messages[start:]
+
+    def _store_local(self, conversation_id, messages, now):
+        with self._lock:
+            self._entries[conversation_id] = (now, messages)
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_conversations:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "conversations": len(self._entries),
+                "max_conversations": self.max_conversations,
+                "context_tokens": self.context_tokens,
+                "reserve_tokens": self.reserve_tokens,
+                "redis": self.redis is not None,
+                "trimmed_messages": self.trimmed_messages,
+            }
+
+
+def conversations_from_env():
+    """ConversationStore configured from the CHATBOT_* environment variables"""
+    return ConversationStore(
+        max_conversations=int(os.getenv("CHATBOT_MAX_CONVERSATIONS") or 1024),
+        idle_ttl=int(os.getenv("CHATBOT_CONVERSATION_TTL") or 3600),
+        context_tokens=int(os.getenv("CHATBOT_NUM_CTX") or 1024),
+        reserve_tokens=int(os.getenv("CHATBOT_RESERVE_TOKENS") or 384),
+        redis_url=os.getenv("CHATBOT_REDIS_URL"),
+    )
@@ -0,0 +1,177 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import pooling
+from flask import g, request
+
+
+class _TimedCursor:
+    """Cursor wrapper that reports how long each statement took"""
+
+    def __init__(self, cursor, observe):
+        self._cursor = cursor
+        self._observe = observe
+
+    def execute(self, operation, params=None, multi=False):
+        started = time.perf_counter()
+        if multi:
+            # The statements run as the returned generator is consumed, so time across that
+            return self._timed_results(self._cursor.execute(operation, params, multi=True), started)
+        try:
+            return self._cursor.execute(operation, params)
+        finally:
+            self._observe(time.perf_counter() - started)
+
+    def _timed_results(self, results, started):
+        try:
+            yield from results
+        finally:
+            self._observe(time.perf_counter() - started)
+
+    def executemany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(*args, **kwargs)
+        finally:
+            self._observe(time.perf_counter() - started)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _TimedConnection:
+    """Connection wrapper whose cursors are timed, attributing each statement to a Flask route"""
+
+    def __init__(self, conn, observer, route):
+        self._conn = conn
+        self._observe = lambda seconds: observer(route, seconds)
+
+    def cursor(self, *args, **kwargs):
+        return _TimedCursor(self._conn.cursor(*args, **kwargs), self._observe)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class Database:
+    """Pooled access to the main MySQL database.
+
+    Routes call `get_db()` to borrow one connection for the whole request; it goes back
+    to the pool when the app context tears down. Connections are pinged (and reconnected
+    if MySQL dropped them) on checkout, and callers wait up to `timeout` seconds for a free
+    connection instead of failing straight away when the pool is exhausted.
+
+    With `observer` set, statements run through `get_db()` are timed and reported as
+    observer(route, seconds).
+    """
+
+    def __init__(self, pool_size=10, timeout=5.0, pool_name="signverse", **connect_args):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pool = pooling.MySQLConnectionPool(pool_name=pool_name, pool_size=pool_size, **connect_args)
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.timeouts = 0
+        self.reconnects = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.observer = None
+
+    def acquire(self):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._stats_lock:
+                self.timeouts += 1
+            raise mysql.connector.errors.PoolError(f"No database connection available after {self.timeout}s")
+        try:
+            conn = self._pool.get_connection()
+            if not conn.is_connected():
+                conn.reconnect(attempts=3, delay=0.2)
+                with self._stats_lock:
+                    self.reconnects += 1
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return conn
+
+    def release(self, conn, failed=False):
+        try:
+            if failed:
+                conn.rollback()
+            conn.close()  # returns the connection to the pool
+        except mysql.connector.Error:
+            pass
+        finally:
+            with self._stats_lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection outside of a request (e.g. at startup)"""
+        conn = self.acquire()
+        failed = False
+        try:
+            yield conn
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.release(conn, failed)
+
+    def init_app(self, app):
+        app.teardown_appcontext(self._teardown)
+
+    def _teardown(self, exc):
+        conn = g.pop("db_conn", None)
+        if conn is not None:
+            self.release(conn, failed=exc is not None)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "pool_size": self.pool_size,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "reconnects": self.reconnects,
+                "avg_wait_ms": round(self.wait_seconds / self.checkouts * 1000.0, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000.0, 3),
+            }
+
+
+database = None
+
+
+def init_db(app, **kwargs):
+    global database
+    database = Database(**kwargs)
+    database.init_app(app)
+    return database
+
+
+def get_db():
+    """The current request's pooled connection, checked out on first use"""
+    if "db_conn" not in g:
+        conn = database.acquire()
+        if database.observer is not None:
+            conn = _TimedConnection(conn, database.observer, request.endpoint or "none")
+        g.db_conn = conn
+    return g.db_conn
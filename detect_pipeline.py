@@ -0,0 +1,191 @@
+import re
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+
+from sign_session import SignTimings
+
+# Detection and sentence-building defaults, shared by app.py and bench_detect.py
+CONF_THRESHOLD = 0.3
+STABLE_SIGN_SECONDS = 1.75
+SPACE_AFTER = 3.5
+COMMA_AFTER = 8
+FULLSTOP_AFTER = 12
+ACCEPT_COOLDOWN = 0.0
+SIGN_TIMINGS = SignTimings(STABLE_SIGN_SECONDS, SPACE_AFTER, COMMA_AFTER, FULLSTOP_AFTER, ACCEPT_COOLDOWN)
+
+# Stages timed by DetectPipeline.run, in pipeline order
+STAGES = ("decode", "preprocess", "inference", "pick_label", "state", "format")
+
+
+def pick_label_from_result(res, class_names, conf_threshold):
+    try:
+        boxes = res.boxes
+        if boxes is None or len(boxes) == 0:
+            return None, None, None
+        confs = boxes.conf.cpu().numpy()
+        classes = boxes.cls.cpu().numpy().astype(int)
+        xyxy = boxes.xyxy.cpu().numpy()
+        best_i = int(np.argmax(confs))
+        conf = float(confs[best_i])
+        if conf < conf_threshold:
+            return None, None, None
+        cls_idx = int(classes[best_i])
+        label = class_names.get(cls_idx, str(cls_idx))
+        x1, y1, x2, y2 = [float(v) for v in xyxy[best_i]]
+        return label, conf, (x1, y1, x2, y2)
+    except:
+        return None, None, None
+
+
+def class_scores_from_result(res, num_classes):
+    """Best confidence per class in this frame, as a vector indexed by class id"""
+    scores = np.zeros(num_classes, dtype=np.float32)
+    boxes = res.boxes
+    if boxes is not None and len(boxes):
+        np.maximum.at(scores, boxes.cls.cpu().numpy().astype(int), boxes.conf.cpu().numpy())
+    return scores
+
+
+def format_sentence(raw_sentence):
+    raw_sentence = re.sub(r'\s+', ' ', raw_sentence.strip())
+    formatted = ""
+    capitalize_next = True
+    word_buffer = ""
+    for c in raw_sentence:
+        if c.isalpha():
+            word_buffer += c.lower()
+        else:
+            if word_buffer:
+                if capitalize_next:
+                    formatted += word_buffer[0].upper() + word_buffer[1:]
+                    capitalize_next = False
+                else:
+                    formatted += word_buffer
+                word_buffer = ""
+            formatted += c
+            if c in ".!?":
+                capitalize_next = True
+            else:
+                capitalize_next = False
+    if word_buffer:
+        if capitalize_next:
+            formatted += word_buffer[0].upper() + word_buffer[1:]
+        else:
+            formatted += word_buffer
+    return formatted
+
+
+class DetectPipeline:
+    """One encoded frame in, one /detect payload out: decode -> ROI -> letterbox -> motion gate ->
+    inference -> label pick -> smoothing and sentence state -> formatting.
+
+    Shared by the HTTP route, the Socket.IO frame channel and bench_detect.py. Pass a dict
+    as `timings` to `run()` to get the seconds spent in each of STAGES for that frame.
+    A frame that waits longer than `infer_timeout` seconds for the detector gets a 503.
+    """
+
+    def __init__(self, preprocessor, scheduler, class_names, conf_threshold, smoother, motion_gate, roi_tracker,
+                 infer_timeout=10.0):
+        self.preprocessor = preprocessor
+        self.scheduler = scheduler
+        self.class_names = class_names
+        self.num_classes = max(class_names) + 1
+        self.conf_threshold = conf_threshold
+        self.smoother = smoother
+        self.motion_gate = motion_gate
+        self.roi_tracker = roi_tracker
+        self.infer_timeout = infer_timeout
+
+    @staticmethod
+    def _lap(timings, stage, started):
+        now = time.perf_counter()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + (now - started)
+        return now
+
+    def infer(self, frame, timings=None):
+        """Run a prepared frame through the scheduler; returns (label, conf, bbox in original pixels, class scores)"""
+        started = time.perf_counter()
+        result = self.scheduler.infer(frame.image, frame.imgsz, timeout=self.infer_timeout)
+        started = self._lap(timings, "inference", started)
+        label, conf, bbox = pick_label_from_result(result, self.class_names, self.conf_threshold)
+        scores = class_scores_from_result(result, self.num_classes) if self.smoother.enabled else None
+        self._lap(timings, "pick_label", started)
+        return label, conf, frame.to_original(bbox) if bbox else None, scores
+
+    def run(self, img_data, sign_session, timings=None):
+        """Run one encoded frame through the model and the session's state machine; returns (payload, status)"""
+        preprocessor, motion_gate, roi_tracker = self.preprocessor, self.motion_gate, self.roi_tracker
+        started = time.perf_counter()
+        try:
+            decoded = preprocessor.decode(img_data)
+        except Exception as e:
+            return {"error": f"bad image: {e}"}, 400
+        started = self._lap(timings, "decode", started)
+
+        with sign_session.lock:
+            roi = roi_tracker.plan(sign_session)
+        frame = preprocessor.letterbox(decoded, roi_tracker.imgsz if roi else None, roi)
+
+        picked = None
+        if motion_gate.enabled:
+            thumb = motion_gate.thumbnail(frame.image)
+            with sign_session.lock:
+                picked = motion_gate.lookup(sign_session, thumb, time.time())
+        self._lap(timings, "preprocess", started)
+
+        if picked is None:
+            try:
+                picked = self.infer(frame, timings)
+                if roi is not None and not picked[0]:
+                    # Lost the hand inside the crop: retry this frame at full field of view
+                    with sign_session.lock:
+                        roi_tracker.update(sign_session, picked, roi, decoded.orig_w, decoded.orig_h)
+                    preprocessor.release(frame)
+                    roi = None
+                    started = time.perf_counter()
+                    frame = preprocessor.letterbox(decoded)
+                    self._lap(timings, "preprocess", started)
+                    picked = self.infer(frame, timings)
+                    if motion_gate.enabled:
+                        thumb = motion_gate.thumbnail(frame.image)
+            except FutureTimeout:
+                preprocessor.release(frame)
+                return {"error": "detector busy, please retry"}, 503
+            except Exception as e:
+                preprocessor.release(frame)
+                return {"error": f"inference failed: {e}"}, 500
+            with sign_session.lock:
+                roi_tracker.update(sign_session, picked, roi, decoded.orig_w, decoded.orig_h)
+                if motion_gate.enabled:
+                    motion_gate.store(sign_session, thumb, picked, time.time())
+        preprocessor.release(frame)
+
+        label, conf, bbox, scores = picked
+        now = time.time()
+        boxes = []
+
+        if bbox and label:
+            x1, y1, x2, y2 = bbox
+            boxes.append({"class": label, "conf": conf, "x1": int(x1), "y1": int(y1),
+                          "x2": int(x2), "y2": int(y2)})
+
+        started = time.perf_counter()
+        with sign_session.lock:
+            # Pause detection while editing
+            if sign_session.pause_detection:
+                self._lap(timings, "state", started)
+                return {"boxes": boxes, "sentence": sign_session.sentence, "countdowns": {}}, 200
+            if self.smoother.enabled:
+                # The hold timer follows the smoothed label so one flickering frame doesn't restart it
+                cls_idx, _ = self.smoother.smooth(sign_session, scores if label else None, self.conf_threshold)
+                label = self.class_names.get(cls_idx, str(cls_idx)) if cls_idx is not None else None
+            countdowns = sign_session.advance(label, now)
+            sentence = sign_session.sentence
+        started = self._lap(timings, "state", started)
+
+        formatted_sentence = format_sentence(sentence.strip())
+        self._lap(timings, "format", started)
+        return {"boxes": boxes, "sentence": formatted_sentence, "countdowns": countdowns}, 200
@@ -0,0 +1,79 @@
+import threading
+import time
+
+
+class FeedbackBroadcaster:
+    """Pushes feedback reactions and new feedback to the Socket.IO "feedback" room.
+
+    Changes are coalesced and flushed at most every `interval` seconds as one
+    "feedback-update" event carrying each touched card's latest counts, any new feedback
+    and the current totals. The totals double as an in-memory snapshot for /feedback_stats;
+    `load_totals()` refreshes it from the database once it is older than `max_age` seconds,
+    which bounds how stale it can get when other workers take the writes.
+    """
+
+    room = "feedback"
+
+    def __init__(self, socketio, load_totals, interval=0.5, max_age=10.0):
+        self.socketio = socketio
+        self.load_totals = load_totals
+        self.interval = interval
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._totals = None
+        self._totals_at = 0.0
+        self._counts = {}
+        self._new = []
+        self._dirty = False
+        self.flushes = 0
+        self.events = 0
+        socketio.start_background_task(self._flush_forever)
+
+    def totals(self):
+        with self._lock:
+            if self._totals is not None and time.time() - self._totals_at <= self.max_age:
+                return dict(self._totals)
+        totals = self.load_totals()
+        self._set_totals(totals)
+        return dict(totals)
+
+    def _set_totals(self, totals):
+        with self._lock:
+            self._totals = dict(totals)
+            self._totals_at = time.time()
+
+    def reaction(self, feedback_id, likes, dislikes, totals):
+        with self._lock:
+            self._counts[feedback_id] = {"likes": likes, "dislikes": dislikes}
+            self._totals = dict(totals)
+            self._totals_at = time.time()
+            self._dirty = True
+            self.events += 1
+
+    def new_feedback(self, item, totals):
+        with self._lock:
+            self._new.append(item)
+            self._totals = dict(totals)
+            self._totals_at = time.time()
+            self._dirty = True
+            self.events += 1
+
+    def _flush_forever(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            with self._lock:
+                if not self._dirty:
+                    continue
+                payload = {"counts": self._counts, "new": self._new, "stats": dict(self._totals)}
+                self._counts = {}
+                self._new = []
+                self._dirty = False
+                self.flushes += 1
+            try:
+                self.socketio.emit("feedback-update", payload, to=self.room)
+            except Exception as e:
+                print("[WARN] Feedback broadcast failed:", e)
+
+    def stats(self):
+        with self._lock:
+            return {"events": self.events, "flushes": self.flushes, "interval": self.interval}
@@ -0,0 +1,167 @@
+import hashlib
+import math
+import os
+import threading
+
+import cv2
+import numpy as np
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+def _fingerprint(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            h.update(block)
+    return h.hexdigest()[:12]
+
+
+class GlyphIndex:
+    """In-memory manifest of the text-to-sign glyphs under static/images and static/signs.
+
+    Maps each letter/digit to a content-fingerprinted URL (served with far-future immutable
+    cache headers) so /get_images needs no filesystem access per character. The directories
+    are re-checked at most every `refresh_interval` seconds and the index rebuilt if their
+    listing changed. With `atlas` set, the images are also packed into one sprite sheet so
+    a whole sentence renders from a single cached fetch.
+
+    Each rebuild produces a complete manifest that replaces the old one in a single
+    assignment, so readers never see half-built state. With `socketio` given, the re-check
+    runs as a background task instead of inside requests.
+    """
+
+    def __init__(self, static_root="static", image_dir="images", video_dir="signs",
+                 atlas=True, cell=(256, 200), refresh_interval=5.0, socketio=None):
+        self.static_root = static_root
+        self.image_dir = image_dir
+        self.video_dir = video_dir
+        self.atlas_enabled = atlas
+        self.cell = cell
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        # images: char -> {"file", "path", "url", "sprite"}; videos: char -> url;
+        # files: (fingerprint, filename) -> path
+        self.manifest = {"images": {}, "videos": {}, "files": {}, "atlas_bytes": None, "atlas_url": None}
+        self.rebuilds = 0
+        self.refresh()
+        if socketio is not None and refresh_interval > 0:
+            socketio.start_background_task(self._refresh_forever, socketio.sleep)
+
+    def _refresh_forever(self, sleep):
+        while True:
+            sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print("[WARN] Glyph index refresh failed:", e)
+
+    def _listing(self):
+        listing = []
+        for sub in (self.image_dir, self.video_dir):
+            directory = os.path.join(self.static_root, sub)
+            try:
+                for entry in os.scandir(directory):
+                    if entry.is_file():
+                        st = entry.stat()
+                        listing.append((sub, entry.name, st.st_size, st.st_mtime))
+            except OSError:
+                pass
+        return tuple(sorted(listing))
+
+    def refresh(self):
+        """Rebuild the manifest if the glyph directories' listing changed"""
+        with self._lock:
+            signature = self._listing()
+            if signature == self._signature:
+                return
+            self.manifest = self._build(signature)
+            self._signature = signature
+            self.rebuilds += 1
+
+    def _build(self, listing):
+        images, videos, files = {}, {}, {}
+        for sub, name, _, _ in listing:
+            stem, ext = os.path.splitext(name)
+            if len(stem) != 1 or not stem.isalnum():
+                continue
+            path = os.path.join(self.static_root, sub, name)
+            fingerprint = _fingerprint(path)
+            files[(fingerprint, name)] = path
+            url = f"/glyph/{fingerprint}/{name}"
+            if sub == self.image_dir and ext.lower() in (".jpeg", ".jpg", ".png"):
+                images[stem.upper()] = {"file": name, "path": path, "url": url, "sprite": None}
+            elif sub == self.video_dir:
+                videos[stem.upper()] = url
+
+        atlas_bytes = atlas_url = None
+        if self.atlas_enabled and images:
+            try:
+                atlas_bytes = self._build_atlas(images)
+                atlas_url = f"/glyph-atlas/{hashlib.sha1(atlas_bytes).hexdigest()[:12]}.jpeg"
+            except Exception as e:
+                print("[WARN] Glyph atlas disabled:", e)
+                atlas_bytes = None
+                for glyph in images.values():
+                    glyph["sprite"] = None
+
+        if atlas_url:
+            for glyph in images.values():
+                glyph["sprite"]["atlas"] = atlas_url
+        return {"images": images, "videos": videos, "files": files,
+                "atlas_bytes": atlas_bytes, "atlas_url": atlas_url}
+
+    def _build_atlas(self, images):
+        """Letterbox every glyph into a fixed cell of one grid image; records each glyph's CSS sprite position"""
+        cell_w, cell_h = self.cell
+        chars = sorted(images)
+        columns = math.ceil(math.sqrt(len(chars)))
+        rows = math.ceil(len(chars) / columns)
+        sheet = np.full((rows * cell_h, columns * cell_w, 3), 255, dtype=np.uint8)
+        for i, char in enumerate(chars):
+            img = cv2.imread(images[char]["path"], cv2.IMREAD_COLOR)
+            if img is None:
+                raise ValueError(f"Cannot read {images[char]['path']}")
+            h, w = img.shape[:2]
+            scale = min(cell_w / w, cell_h / h)
+            nw, nh = max(1, int(w * scale)), max(1, int(h * scale))
+            resized = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_AREA)
+            row, col = divmod(i, columns)
+            y = row * cell_h + (cell_h - nh) // 2
+            x = col * cell_w + (cell_w - nw) // 2
+            sheet[y:y + nh, x:x + nw] = resized
+            images[char]["sprite"] = {
+                "position": f"{(col / (columns - 1) * 100) if columns > 1 else 0:.4f}% "
+                            f"{(row / (rows - 1) * 100) if rows > 1 else 0:.4f}%",
+                "size": f"{columns * 100}% {rows * 100}%",
+                "aspect": f"{cell_w} / {cell_h}",
+            }
+        ok, encoded = cv2.imencode(".jpg", sheet, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        if not ok:
+            raise ValueError("Atlas encoding failed")
+        return encoded.tobytes()
+
+    def image(self, char):
+        return self.manifest["images"].get(char.upper())
+
+    def video(self, char):
+        return self.manifest["videos"].get(char.upper())
+
+    def path_for(self, fingerprint, filename):
+        return self.manifest["files"].get((fingerprint, filename))
+
+    def atlas(self, url):
+        """The sprite sheet's bytes if `url` is the current atlas URL, else None"""
+        manifest = self.manifest
+        return manifest["atlas_bytes"] if manifest["atlas_url"] == url else None
+
+    def stats(self):
+        manifest = self.manifest
+        return {
+            "images": len(manifest["images"]),
+            "videos": len(manifest["videos"]),
+            "atlas": manifest["atlas_url"],
+            "atlas_bytes": len(manifest["atlas_bytes"]) if manifest["atlas_bytes"] else 0,
+            "rebuilds": self.rebuilds,
+        }
@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+
+class InferenceScheduler:
+    """Collects frames from concurrent requests and runs them through the model in micro-batches.
+
+    Callers block in `infer()` until their frame's result is ready. A single worker
+    thread owns the model, so the model is never called from two threads at once.
+    `on_batch(frames, seconds)`, if given, is called after every forward pass.
+    """
+
+    def __init__(self, model, max_batch=8, max_wait_ms=10.0, on_batch=None):
+        self.model = model
+        self.on_batch = on_batch
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._frames = 0
+        self._batches = 0
+        self._max_queue_depth = 0
+        self._busy_seconds = 0.0
+        self._worker = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, img, imgsz=None):
+        """Queue one frame and return a Future resolving to its Results object.
+
+        Frames with different `imgsz` (e.g. full frames vs hand crops) share a batch
+        window but are run as separate forward passes.
+        """
+        fut = Future()
+        self._queue.put((img, imgsz, fut))
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+        return fut
+
+    def infer(self, img, imgsz=None, timeout=None):
+        return self.submit(img, imgsz).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            groups = {}
+            for img, imgsz, fut in self._collect():
+                groups.setdefault(imgsz, []).append((img, fut))
+            for imgsz, batch in groups.items():
+                self._run_batch(batch, imgsz)
+
+    def _run_batch(self, batch, imgsz):
+        images = [img for img, _ in batch]
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        started = time.perf_counter()
+        try:
+            results = self.model(images, **kwargs)
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._stats_lock:
+                self._batches += 1
+                self._frames += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                self._busy_seconds += elapsed
+            if self.on_batch is not None:
+                # A failing hook must not kill the worker thread and strand every queued Future
+                try:
+                    self.on_batch(len(batch), elapsed)
+                except Exception as e:
+                    print("[WARN] Inference on_batch hook failed:", e)
+
+        for (_, fut), res in zip(batch, results):
+            fut.set_result(res)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "frames": self._frames,
+                "avg_batch_size": round(self._frames / self._batches, 3) if self._batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "busy_seconds": round(self._busy_seconds, 3),
+            }
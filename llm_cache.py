@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Collapse whitespace and case so trivially different inputs share a cache entry"""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+class LLMCache:
+    """Content-addressed cache of LLM endpoint results.
+
+    Keys hash (model, endpoint, normalized text, extra params such as style or language).
+    An in-process LRU (bounded by `max_entries`, entries expire after `ttl` seconds) sits in
+    front of an optional Redis tier shared by all workers. Redis failures only cost a miss.
+    """
+
+    def __init__(self, max_entries=2048, ttl=86400, redis_url=None, prefix="signverse:llm:"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prefix = prefix
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis = None
+        if redis_url:
+            try:
+                import redis
+                self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.2, socket_connect_timeout=0.2)
+                self.redis.ping()
+            except Exception as e:
+                print("[WARN] LLM cache Redis tier disabled:", e)
+                self.redis = None
+
+    def key(self, model, endpoint, text, *params):
+        raw = json.dumps([model, endpoint, normalize_text(text)] + [normalize_text(str(p)) for p in params])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(self.prefix + key)
+            except Exception:
+                raw = None
+            if raw is not None:
+                try:
+                    value = json.loads(raw)
+                except ValueError:
+                    # Corrupt or foreign value under our key: treat it as a miss
+                    raw = None
+            if raw is not None:
+                self._store_local(key, value, now)
+                with self._lock:
+                    self.redis_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        self._store_local(key, value, time.time())
+        if self.redis is not None:
+            try:
+                self.redis.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+            except Exception:
+                pass
+
+    def _store_local(self, key, value, now):
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.redis_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "redis": self.redis is not None,
+                "hits": self.hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+def cache_from_env():
+    """LLMCache configured from the LLM_CACHE_* environment variables (shared by the app and job workers)"""
+    return LLMCache(
+        max_entries=int(os.getenv("LLM_CACHE_SIZE") or 2048),
+        ttl=int(os.getenv("LLM_CACHE_TTL") or 86400),
+        redis_url=os.getenv("LLM_CACHE_REDIS_URL"),
+    )
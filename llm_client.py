@@ -0,0 +1,270 @@
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class LLMBusy(Exception):
+    """Raised when a model's request queue is full; routes answer 503"""
+
+
+class LLMError(Exception):
+    """Raised when Ollama fails or returns an error status"""
+
+
+def clean_reply(text):
+    """Strip Markdown code-block markers from a model reply"""
+    return text.replace("```json", "").replace("```", "").strip()
+
+
+def parse_json_reply(text):
+    """Parse a (fenced) JSON model reply; returns None if it isn't a JSON object"""
+    try:
+        parsed = json.loads(clean_reply(text))
+    except Exception:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+class TokenStream:
+    """Iterator over the text chunks of a streaming generation.
+
+    Holds the model's concurrency slot and the HTTP response until it is exhausted or closed.
+    """
+
+    def __init__(self, response, stack, extract=None, on_done=None):
+        self._response = response
+        self._stack = stack
+        self._extract = extract or (lambda chunk: chunk.get("response", ""))
+        self._on_done = on_done
+
+    def __iter__(self):
+        try:
+            for line in self._response.iter_lines():
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except ValueError:
+                    continue
+                if chunk.get("error"):
+                    raise LLMError(f"Ollama error: {chunk['error']}")
+                token = self._extract(chunk)
+                if token:
+                    yield token
+                if chunk.get("done"):
+                    if self._on_done is not None:
+                        self._on_done(chunk)
+                    break
+        except requests.exceptions.RequestException as e:
+            raise LLMError(f"Ollama stream failed: {e}") from e
+        finally:
+            self.close()
+
+    def close(self):
+        self._stack.close()
+
+
+class _ModelGate:
+    __slots__ = ("semaphore", "waiting", "in_flight", "completed", "rejected", "errors", "busy_seconds")
+
+    def __init__(self, concurrency):
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+
+class OllamaClient:
+    """Shared Ollama client: one keep-alive connection pool, per-model concurrency limits and timeouts.
+
+    At most `concurrency` generations per model run at once; up to `max_queue` more may
+    wait (for at most `queue_timeout` seconds). Anything beyond that is rejected with
+    LLMBusy so one user cannot pile up work that holds every worker.
+
+    If `observer` is set it is called as observer(model, endpoint, path, seconds, eval_count,
+    eval_duration) after each completed request, with Ollama's token counters. `endpoint`
+    is the feature the caller names (e.g. the job kind), `path` the Ollama API used.
+    """
+
+    def __init__(self, host="http://localhost:11434", concurrency=2, model_concurrency=None,
+                 max_queue=8, queue_timeout=30.0, connect_timeout=3.0, read_timeout=120.0,
+                 retries=2, pool_size=16):
+        self.host = host.rstrip("/")
+        self.concurrency = concurrency
+        self.model_concurrency = model_concurrency or {}
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._gates = {}
+        self.observer = None
+
+    def _gate(self, model):
+        with self._lock:
+            gate = self._gates.get(model)
+            if gate is None:
+                gate = self._gates[model] = _ModelGate(self.model_concurrency.get(model, self.concurrency))
+            return gate
+
+    @contextmanager
+    def slot(self, model):
+        """Hold one of `model`'s concurrency slots, queueing (bounded) if they are all taken"""
+        gate = self._gate(model)
+        with self._lock:
+            if gate.waiting >= self.max_queue:
+                gate.rejected += 1
+                raise LLMBusy(f"{model} is busy, please try again shortly")
+            gate.waiting += 1
+        acquired = gate.semaphore.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            gate.waiting -= 1
+            if not acquired:
+                gate.rejected += 1
+            else:
+                gate.in_flight += 1
+        if not acquired:
+            raise LLMBusy(f"{model} is busy, please try again shortly")
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                gate.in_flight -= 1
+                gate.busy_seconds += time.perf_counter() - started
+                if failed:
+                    gate.errors += 1
+                else:
+                    gate.completed += 1
+            gate.semaphore.release()
+
+    def _post(self, path, payload, stream=False):
+        last_error = None
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.post(f"{self.host}{path}", json=payload, timeout=self.timeout, stream=stream)
+            except requests.exceptions.ConnectionError as e:
+                # Only connection failures are retried; a slow generation is not re-run
+                last_error = e
+                if attempt < self.retries:
+                    time.sleep(0.5 * (attempt + 1))
+                continue
+            except requests.exceptions.RequestException as e:
+                raise LLMError(f"Ollama request failed: {e}") from e
+            if response.status_code != 200:
+                response.close()
+                raise LLMError(f"Ollama error {response.status_code}")
+            return response
+        raise LLMError(f"Failed to reach Ollama after {self.retries + 1} attempts: {last_error}")
+
+    def _observe(self, model, endpoint, path, started, reply):
+        if self.observer is not None:
+            self.observer(model, endpoint or "other", path, time.perf_counter() - started,
+                          reply.get("eval_count"), reply.get("eval_duration"))
+
+    def generate(self, model, prompt, endpoint=None, **options):
+        """Run one non-streaming generation and return the full response text"""
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        payload.update(options)
+        with self.slot(model):
+            started = time.perf_counter()
+            response = self._post("/api/generate", payload)
+            try:
+                reply = response.json()
+            except ValueError as e:
+                raise LLMError(f"Bad response from Ollama: {e}") from e
+            self._observe(model, endpoint, "/api/generate", started, reply)
+            return reply.get("response", "")
+
+    def chat(self, model, messages, keep_alive=None, endpoint=None, **options):
+        """Run one non-streaming /api/chat turn over `messages` and return the reply text.
+
+        `keep_alive` keeps the model (and its KV cache for the shared prefix) loaded between turns.
+        """
+        payload = {"model": model, "messages": messages, "stream": False}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        payload.update(options)
+        with self.slot(model):
+            started = time.perf_counter()
+            response = self._post("/api/chat", payload)
+            try:
+                reply = response.json()
+            except ValueError as e:
+                raise LLMError(f"Bad response from Ollama: {e}") from e
+            self._observe(model, endpoint, "/api/chat", started, reply)
+            return (reply.get("message") or {}).get("content", "")
+
+    def stream_generate(self, model, prompt, endpoint=None, **options):
+        """Start a streaming generation and return a TokenStream.
+
+        The concurrency slot is taken (or LLMBusy raised) before this returns, so callers
+        can still answer with a plain error status instead of an empty stream.
+        """
+        payload = {"model": model, "prompt": prompt, "stream": True}
+        payload.update(options)
+        return self._stream(model, endpoint, "/api/generate", payload)
+
+    def stream_chat(self, model, messages, keep_alive=None, endpoint=None, **options):
+        """Streaming counterpart of chat(); returns a TokenStream of reply chunks"""
+        payload = {"model": model, "messages": messages, "stream": True}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        payload.update(options)
+        return self._stream(model, endpoint, "/api/chat", payload,
+                            extract=lambda chunk: (chunk.get("message") or {}).get("content", ""))
+
+    def _stream(self, model, endpoint, path, payload, extract=None):
+        stack = ExitStack()
+        try:
+            stack.enter_context(self.slot(model))
+            started = time.perf_counter()
+            response = self._post(path, payload, stream=True)
+            stack.callback(response.close)
+        except BaseException:
+            stack.close()
+            raise
+        on_done = (lambda chunk: self._observe(model, endpoint, path, started, chunk)) if self.observer else None
+        return TokenStream(response, stack, extract, on_done)
+
+    def stats(self):
+        with self._lock:
+            return {
+                model: {
+                    "in_flight": gate.in_flight,
+                    "waiting": gate.waiting,
+                    "completed": gate.completed,
+                    "rejected": gate.rejected,
+                    "errors": gate.errors,
+                    "busy_seconds": round(gate.busy_seconds, 3),
+                }
+                for model, gate in self._gates.items()
+            }
+
+
+def ollama_from_env():
+    """OllamaClient configured from the OLLAMA_* environment variables (shared by the app and job workers)"""
+    return OllamaClient(
+        host=os.getenv("OLLAMA_HOST") or "http://localhost:11434",
+        concurrency=int(os.getenv("OLLAMA_CONCURRENCY") or 2),
+        max_queue=int(os.getenv("OLLAMA_MAX_QUEUE") or 8),
+        queue_timeout=float(os.getenv("OLLAMA_QUEUE_TIMEOUT") or 30),
+        read_timeout=float(os.getenv("OLLAMA_TIMEOUT") or 120),
+    )
@@ -0,0 +1,536 @@
+"""Queued LLM work (chatbot replies, corrections, rewrites, translations) off the request path.
+
+With LLM_JOBS_REDIS_URL set, jobs go to Celery workers over Redis:
+
+    celery -A llm_jobs worker -Q llm --concurrency 2
+
+Otherwise they run on a few in-process worker threads. Every submission gets its own random
+job id; identical jobs (same model and inputs) that are still queued or running share one run
+through a content-derived dedup key, so the work is done once but ids cannot be guessed.
+"""
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from dotenv import load_dotenv
+
+from conversation_store import conversations_from_env
+from llm_cache import cache_from_env
+from llm_client import LLMBusy, LLMError, ollama_from_env, parse_json_reply
+from llm_prompts import (
+    GRAMMAR_MODEL, CHATBOT_MODEL, STYLE_ENHANCE_STYLES, SUPPORTED_LANGUAGES,
+    grammar_prompt, shape_grammar, style_prompt, shape_style, enhancement_prompt, shape_enhancement,
+    translation_prompt, shape_translation, shape_chatbot, pipeline_prompt, shape_pipeline,
+)
+
+load_dotenv()
+
+# Lower runs first; interactive chatbot replies jump ahead of batch rewrites
+PRIORITIES = {"interactive": 0, "batch": 6}
+JOB_KINDS = ("chatbot", "grammar", "style_enhance", "style_enhancement", "translation", "pipeline", "sentence")
+FINISHED = ("done", "failed")
+
+
+
+def default_priority(kind):
+    return "interactive" if kind == "chatbot" else "batch"
+
+
+# Keeps the chatbot model (and its KV cache for the shared prefix) loaded between turns
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE") or "30m"
+
+JobSpec = namedtuple("JobSpec", "kind params model key_parts prompt shape")
+
+
+def _language_name(params, required=True):
+    target_language = (params.get("language") or "").strip().lower()
+    if not target_language:
+        if required:
+            raise ValueError("No target language specified")
+        return None
+    if target_language not in SUPPORTED_LANGUAGES:
+        raise ValueError(f"Unsupported language: {target_language}")
+    return SUPPORTED_LANGUAGES[target_language]
+
+
+def describe_job(kind, params):
+    """Validate a job request and build its JobSpec; raises ValueError on bad input.
+
+    Chatbot jobs carry the conversation window the app built from its server-side history
+    (`conversation_id`, `messages`); their prompt is that message list.
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    text = (params.get("message") if kind == "chatbot" else params.get("text")) or ""
+    text = text.strip()
+    if not text:
+        raise ValueError("No message provided" if kind == "chatbot" else "No input text")
+
+    if kind == "chatbot":
+        conversation_id = params.get("conversation_id") or ""
+        messages = params.get("messages") or [{"role": "user", "content": text}]
+        return JobSpec(kind, {"message": text, "conversation_id": conversation_id, "messages": messages},
+                       CHATBOT_MODEL, ("chatbot", conversation_id, json.dumps(messages)), messages,
+                       lambda out: {"reply": shape_chatbot(out)})
+    if kind == "grammar":
+        return JobSpec(kind, {"text": text}, GRAMMAR_MODEL, ("grammar", text), grammar_prompt(text), shape_grammar)
+    if kind == "style_enhance":
+        style = (params.get("style") or "").strip().lower()
+        if style not in STYLE_ENHANCE_STYLES:
+            raise ValueError(f"Unsupported style '{style}'")
+        return JobSpec(kind, {"text": text, "style": style}, GRAMMAR_MODEL, ("style_enhance", text, style),
+                       style_prompt(text, style), shape_style)
+    if kind == "style_enhancement":
+        style = (params.get("style") or "").strip()
+        if not style:
+            raise ValueError("No style selected")
+        return JobSpec(kind, {"text": text, "style": style}, GRAMMAR_MODEL, ("style_enhancement", text, style),
+                       enhancement_prompt(text, style), shape_enhancement)
+
+    if kind == "pipeline":
+        # One generation for correction + optional rewrite + optional translation; None if a stage is missing
+        style = (params.get("style") or "").strip() or None
+        language_name = _language_name(params, required=False)
+        return JobSpec(kind, {"text": text, "style": style, "language": params.get("language")}, GRAMMAR_MODEL,
+                       ("pipeline", text, style or "", language_name or ""),
+                       pipeline_prompt(text, style, language_name),
+                       lambda out: shape_pipeline(out, style, language_name))
+    if kind == "sentence":
+        # The whole /process_sentence flow; run_sentence() runs its stages inside the worker
+        style = (params.get("style") or "").strip() or None
+        language_name = _language_name(params, required=False)
+        mode = params.get("mode") or "single"
+        if mode not in ("single", "chain"):
+            raise ValueError(f"Unsupported mode '{mode}'")
+        language = params["language"].strip().lower() if language_name else None
+        return JobSpec(kind, {"text": text, "style": style, "language": language, "mode": mode}, GRAMMAR_MODEL,
+                       ("sentence", text, style or "", language_name or "", mode), None, None)
+
+    language_name = _language_name(params)
+    return JobSpec(kind, {"text": text, "language": params["language"].strip().lower()}, GRAMMAR_MODEL,
+                   ("translation", text, language_name), translation_prompt(text, language_name),
+                   lambda out: shape_translation(out, language_name))
+
+
+def new_job_id():
+    return "llm-" + uuid.uuid4().hex
+
+
+def dedup_key(spec, cache):
+    """Identical jobs (same model and inputs) map to the same key and share one run"""
+    return cache.key(spec.model, *spec.key_parts)[:32]
+
+
+def cached_result(spec, cache):
+    """Result already in the LLM cache, if this kind of job is cacheable"""
+    if spec.kind in ("chatbot", "sentence"):
+        return None
+    return cache.get(cache.key(spec.model, *spec.key_parts))
+
+
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000.0, 1)
+
+
+def run_sentence(params, client, cache):
+    """Grammar correction, optional style rewrite and optional translation of a signed sentence.
+
+    Mode "single" asks for every stage in one generation and falls back to the chained
+    per-stage calls if the reply is missing a stage; "chain" always runs them in sequence.
+    """
+    text, style, language, mode = params["text"], params["style"], params["language"], params["mode"]
+    started = time.perf_counter()
+    timings = {}
+    result = None
+
+    if mode == "single":
+        stage_started = time.perf_counter()
+        result = run_job(describe_job("pipeline", params), client, cache)
+        timings["combined_ms"] = _elapsed_ms(stage_started)
+
+    if result is None:
+        mode = "chain"
+        stage_started = time.perf_counter()
+        result = dict(run_job(describe_job("grammar", {"text": text}), client, cache))
+        timings["correction_ms"] = _elapsed_ms(stage_started)
+        current = result.get("corrected") or text
+
+        if style:
+            stage_started = time.perf_counter()
+            enhanced = run_job(describe_job("style_enhancement", {"text": current, "style": style}), client, cache)
+            timings["style_ms"] = _elapsed_ms(stage_started)
+            result["enhanced"] = enhanced["enhanced"]
+            current = enhanced["enhanced"] or current
+
+        if language:
+            stage_started = time.perf_counter()
+            translated = run_job(describe_job("translation", {"text": current, "language": language}), client, cache)
+            timings["translation_ms"] = _elapsed_ms(stage_started)
+            result["translated"] = translated.get("translated", "")
+            result["language"] = SUPPORTED_LANGUAGES[language]
+
+    result = dict(result)
+    result["final"] = result.get("enhanced") or result.get("corrected") or text
+    result["mode"] = mode
+    timings["total_ms"] = _elapsed_ms(started)
+    result["timings"] = timings
+    return result
+
+
+def run_job(spec, client, cache, conversations=None):
+    """Generate a job's result through the LLM cache; a chatbot reply is appended to its conversation"""
+    if spec.kind == "sentence":
+        return run_sentence(spec.params, client, cache)
+    if spec.kind == "chatbot":
+        result = spec.shape(client.chat(spec.model, spec.prompt, keep_alive=OLLAMA_KEEP_ALIVE, endpoint=spec.kind))
+        if not result["reply"]:
+            raise LLMError("No reply content from Ollama")
+        conversation_id = spec.params["conversation_id"]
+        if conversations is not None and conversation_id:
+            conversations.append(conversation_id, spec.prompt[-1], {"role": "assistant", "content": result["reply"]})
+        return result
+    result = cached_result(spec, cache)
+    if result is not None:
+        return result
+    output_text = client.generate(spec.model, spec.prompt, endpoint=spec.kind)
+    result = spec.shape(output_text)
+    if result is not None and parse_json_reply(output_text) is not None:
+        cache.set(cache.key(spec.model, *spec.key_parts), result)
+    return result
+
+
+def _record(job_id, spec, priority, status, **fields):
+    record = {"job_id": job_id, "kind": spec.kind, "priority": priority, "status": status}
+    record.update(fields)
+    return record
+
+
+class LocalJobQueue:
+    """Priority queue of LLM jobs served by `workers` threads inside the web process.
+
+    Finished jobs are kept for `result_ttl` seconds for polling; `on_update(record)` is
+    called for every job whose run finishes or fails (the app pushes it over Socket.IO).
+    """
+
+    backend = "local"
+
+    def __init__(self, client, cache, workers=2, max_pending=64, result_ttl=600, on_update=None,
+                 conversations=None):
+        self.client = client
+        self.cache = cache
+        self.conversations = conversations
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.on_update = on_update
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._jobs = {}
+        self._runs = {}  # dedup key -> ids of the queued/running jobs sharing that run
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self.submitted = 0
+        self.deduped = 0
+        self.cache_hits = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self._workers = [
+            threading.Thread(target=self._run, name=f"llm-job-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, spec, priority="interactive"):
+        job_id = new_job_id()
+        run = dedup_key(spec, self.cache)
+        result = cached_result(spec, self.cache)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if result is not None:
+                self.cache_hits += 1
+                record = _record(job_id, spec, priority, "done", result=result, finished_at=now)
+                self._jobs[job_id] = record
+                return dict(record)
+            job_ids = self._runs.get(run)
+            if job_ids is not None:
+                self.deduped += 1
+                shared = self._jobs[job_ids[0]]
+                record = _record(job_id, spec, priority, shared["status"], created_at=now)
+                self._jobs[job_id] = record
+                job_ids.append(job_id)
+                return dict(record)
+            pending = sum(1 for ids in self._runs.values() if self._jobs[ids[0]]["status"] == "queued")
+            if pending >= self.max_pending:
+                self.rejected += 1
+                raise LLMBusy("LLM job queue is full, please try again shortly")
+            record = _record(job_id, spec, priority, "queued", created_at=now)
+            self._jobs[job_id] = record
+            self._runs[run] = [job_id]
+            self.submitted += 1
+        self._queue.put((PRIORITIES[priority], next(self._seq), run, spec))
+        return dict(record)
+
+    def get(self, job_id):
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return dict(record) if record is not None else None
+
+    def wait(self, job_id, timeout):
+        """The job's record once it has finished, or as it stands after `timeout` seconds"""
+        with self._finished:
+            self._finished.wait_for(
+                lambda: self._jobs.get(job_id, {}).get("status", "done") in FINISHED, timeout)
+            record = self._jobs.get(job_id)
+            return dict(record) if record is not None else None
+
+    def _expire(self, now):
+        for job_id in [j for j, r in self._jobs.items()
+                       if r.get("finished_at") and now - r["finished_at"] > self.result_ttl]:
+            del self._jobs[job_id]
+
+    def _update_run(self, run, finished=False, **fields):
+        """Apply `fields` to every job sharing `run`; returns copies of their records"""
+        with self._lock:
+            job_ids = self._runs.pop(run, []) if finished else self._runs.get(run, [])
+            records = []
+            for job_id in job_ids:
+                record = self._jobs.get(job_id)
+                if record is not None:
+                    record.update(fields)
+                    records.append(dict(record))
+            if finished:
+                self._finished.notify_all()
+            return records
+
+    def _run(self):
+        while True:
+            _, _, run, spec = self._queue.get()
+            self._update_run(run, status="running", started_at=time.time())
+            try:
+                result = run_job(spec, self.client, self.cache, self.conversations)
+            except Exception as e:
+                records = self._update_run(run, finished=True, status="failed", error=str(e), finished_at=time.time())
+                with self._lock:
+                    self.failed += 1
+            else:
+                records = self._update_run(run, finished=True, status="done", result=result, finished_at=time.time())
+                with self._lock:
+                    self.completed += 1
+            if self.on_update is None:
+                continue
+            for record in records:
+                try:
+                    self.on_update(record)
+                except Exception as e:
+                    print("[WARN] LLM job update hook failed:", e)
+
+    def stats(self):
+        with self._lock:
+            statuses = [r["status"] for r in self._jobs.values()]
+            return {
+                "backend": self.backend,
+                "queued": statuses.count("queued"),
+                "running": statuses.count("running"),
+                "submitted": self.submitted,
+                "deduped": self.deduped,
+                "cache_hits": self.cache_hits,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+
+# --------------------- CELERY BACKEND ---------------------
+REDIS_URL = os.getenv("LLM_JOBS_REDIS_URL")
+RESULT_TTL = int(os.getenv("LLM_JOB_RESULT_TTL") or 600)
+# dedup key -> Celery task id of the run in flight; job id -> its run; task id -> job ids to push to
+INFLIGHT_PREFIX = "signverse:llm-run:"
+JOB_PREFIX = "signverse:llm-job:"
+WATCHERS_PREFIX = "signverse:llm-run-jobs:"
+
+celery_app = None
+if REDIS_URL:
+    from celery import Celery
+    from celery.exceptions import TimeoutError as CeleryTimeout
+
+    celery_app = Celery("signverse", broker=REDIS_URL, backend=REDIS_URL)
+    celery_app.conf.update(
+        task_default_queue="llm",
+        task_serializer="json",
+        result_serializer="json",
+        accept_content=["json"],
+        result_expires=RESULT_TTL,
+        task_track_started=True,
+        # One job at a time per worker process so priorities decide what runs next
+        task_acks_late=True,
+        worker_prefetch_multiplier=1,
+        broker_transport_options={"priority_steps": list(range(10)), "sep": ":", "queue_order_strategy": "priority"},
+    )
+
+    _worker_resources = {}
+
+    def _worker(name, factory):
+        if name not in _worker_resources:
+            _worker_resources[name] = factory()
+        return _worker_resources[name]
+
+    def _push(task_id, record):
+        """Push a finished run to the Socket.IO room of every job sharing it, if a message queue is configured"""
+        message_queue = os.getenv("SOCKETIO_MESSAGE_QUEUE")
+        if not message_queue:
+            return
+        try:
+            from flask_socketio import SocketIO
+            socketio = _worker("socketio", lambda: SocketIO(message_queue=message_queue))
+            for job_id in _worker("redis", lambda: _redis(REDIS_URL)).smembers(WATCHERS_PREFIX + task_id):
+                job_id = job_id.decode()
+                socketio.emit("llm-job", dict(record, job_id=job_id), to=f"job:{job_id}")
+        except Exception as e:
+            print("[WARN] LLM job push failed:", e)
+
+    @celery_app.task(name="llm_jobs.run", bind=True)
+    def llm_task(self, kind, params, priority, run):
+        spec = describe_job(kind, params)
+        task_id = self.request.id
+        redis_client = _worker("redis", lambda: _redis(REDIS_URL))
+        try:
+            result = run_job(spec, _worker("ollama", ollama_from_env), _worker("cache", cache_from_env),
+                             _worker("conversations", conversations_from_env))
+        except Exception as e:
+            _push(task_id, _record(None, spec, priority, "failed", error=str(e)))
+            raise
+        finally:
+            # Later identical submissions start a new run; only clear the marker if it is still ours
+            if redis_client.get(INFLIGHT_PREFIX + run) == task_id.encode():
+                redis_client.delete(INFLIGHT_PREFIX + run)
+        _push(task_id, _record(None, spec, priority, "done", result=result))
+        return result
+
+
+def _redis(url):
+    import redis
+    return redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
+
+
+class CeleryJobQueue:
+    """Submits LLM jobs to Celery workers; a Redis in-flight marker dedups identical jobs across web workers.
+
+    Each run gets a fresh random Celery task id, so a submission never picks up a result
+    left over from an earlier run of the same job.
+    """
+
+    backend = "celery"
+
+    def __init__(self, cache, redis_url=REDIS_URL, result_ttl=RESULT_TTL):
+        self.cache = cache
+        self.result_ttl = result_ttl
+        self.redis = _redis(redis_url)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduped = 0
+        self.cache_hits = 0
+
+    def _remember(self, job_id, job):
+        self.redis.set(JOB_PREFIX + job_id, json.dumps(job), ex=self.result_ttl)
+
+    def submit(self, spec, priority="interactive"):
+        job_id = new_job_id()
+        result = cached_result(spec, self.cache)
+        if result is not None:
+            self._remember(job_id, {"kind": spec.kind, "priority": priority, "result": result})
+            with self._lock:
+                self.cache_hits += 1
+            return _record(job_id, spec, priority, "done", result=result)
+
+        run = dedup_key(spec, self.cache)
+        task_id = uuid.uuid4().hex
+        fresh = bool(self.redis.set(INFLIGHT_PREFIX + run, task_id, nx=True, ex=self.result_ttl))
+        if not fresh:
+            running = self.redis.get(INFLIGHT_PREFIX + run)
+            if running is None:
+                # That run finished in between; start our own
+                self.redis.set(INFLIGHT_PREFIX + run, task_id, ex=self.result_ttl)
+                fresh = True
+            else:
+                task_id = running.decode()
+        self._remember(job_id, {"kind": spec.kind, "priority": priority, "task_id": task_id})
+        self.redis.sadd(WATCHERS_PREFIX + task_id, job_id)
+        self.redis.expire(WATCHERS_PREFIX + task_id, self.result_ttl)
+        if fresh:
+            llm_task.apply_async(args=(spec.kind, spec.params, priority, run), task_id=task_id,
+                                 priority=PRIORITIES[priority])
+        with self._lock:
+            if fresh:
+                self.submitted += 1
+            else:
+                self.deduped += 1
+        return _record(job_id, spec, priority, "queued")
+
+    def _job(self, job_id):
+        raw = self.redis.get(JOB_PREFIX + job_id)
+        return json.loads(raw) if raw is not None else None
+
+    def _status(self, job_id, job):
+        record = {"job_id": job_id, "kind": job["kind"], "priority": job["priority"]}
+        if "result" in job:
+            return dict(record, status="done", result=job["result"])
+        result = celery_app.AsyncResult(job["task_id"])
+        state = result.state
+        if state == "SUCCESS":
+            return dict(record, status="done", result=result.result)
+        if state == "FAILURE":
+            return dict(record, status="failed", error=str(result.result))
+        if state == "STARTED":
+            return dict(record, status="running")
+        return dict(record, status="queued")
+
+    def get(self, job_id):
+        job = self._job(job_id)
+        return self._status(job_id, job) if job is not None else None
+
+    def wait(self, job_id, timeout):
+        """The job's record once it has finished, or as it stands after `timeout` seconds"""
+        job = self._job(job_id)
+        if job is None:
+            return None
+        if "task_id" in job:
+            try:
+                celery_app.AsyncResult(job["task_id"]).get(timeout=timeout, propagate=False)
+            except CeleryTimeout:
+                pass
+        return self._status(job_id, job)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "submitted": self.submitted,
+                "deduped": self.deduped,
+                "cache_hits": self.cache_hits,
+            }
+
+
+def job_queue_from_env(client, cache, conversations=None, on_update=None):
+    """Celery-backed queue when LLM_JOBS_REDIS_URL is set, in-process worker threads otherwise"""
+    if celery_app is not None:
+        try:
+            jobs = CeleryJobQueue(cache)
+            jobs.redis.ping()
+            return jobs
+        except Exception as e:
+            print("[WARN] Celery LLM job queue unavailable, running jobs in-process:", e)
+    return LocalJobQueue(
+        client, cache,
+        workers=int(os.getenv("LLM_JOB_WORKERS") or 2),
+        max_pending=int(os.getenv("LLM_JOB_MAX_PENDING") or 64),
+        result_ttl=RESULT_TTL,
+        on_update=on_update,
+        conversations=conversations,
+    )
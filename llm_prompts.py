@@ -0,0 +1,125 @@
+"""Prompts and reply parsing for the Ollama-backed text endpoints"""
+from llm_client import clean_reply, parse_json_reply
+
+GRAMMAR_MODEL = "gemma2:2b"
+CHATBOT_MODEL = "Sign_Setu"
+
+STYLE_ENHANCE_STYLES = {"formal", "professional", "persuasive", "casual", "poetic"}
+
+SUPPORTED_LANGUAGES = {
+    "hindi": "Hindi",
+    "bengali": "Bengali",
+    "tamil": "Tamil",
+    "telugu": "Telugu",
+    "marathi": "Marathi",
+    "gujarati": "Gujarati",
+    "kannada": "Kannada",
+    "malayalam": "Malayalam",
+    "punjabi": "Punjabi",
+    "urdu": "Urdu"
+}
+
+
+def grammar_prompt(text):
+    return (
+        f"Correct the grammar of this sentence:\n\n{text}\n\n"
+        "Respond ONLY in JSON format like this:\n"
+        '{ "corrected": "<corrected sentence>", "explanation": "<short explanation>" }'
+    )
+
+
+def shape_grammar(output_text):
+    return parse_json_reply(output_text) or {"corrected": clean_reply(output_text), "explanation": "Could not parse JSON"}
+
+
+def style_prompt(text, style):
+    return (
+        f"Rewrite the following text in a {style} style, improving clarity and tone.\n"
+        f"Keep meaning intact and avoid adding extra information.\n\n"
+        f"Text:\n{text}\n\n"
+        "Respond ONLY in JSON like this (no extra keys):\n"
+        '{ "result": "<rewritten text>" }'
+    )
+
+
+def shape_style(output_text):
+    result = parse_json_reply(output_text) or {"result": clean_reply(output_text)}
+    return {"result": str(result.get("result", "")).strip()}
+
+
+def enhancement_prompt(text, style):
+    return (
+        f"Take the following sentence and rewrite it in the style of '{style}'.\n\n"
+        f"Sentence: {text}\n\n"
+        'Respond ONLY in JSON format like this:\n'
+        '{ "enhanced": "<sentence rewritten in selected style>" }'
+    )
+
+
+def strip_style_prefix(enhanced_text):
+    # Remove any prefix like "Professional version:" or "Persuasive version:"
+    if ":" in enhanced_text:
+        enhanced_text = ":".join(enhanced_text.split(":")[1:]).strip()
+    return enhanced_text
+
+
+def shape_enhancement(output_text):
+    result = parse_json_reply(output_text) or {"enhanced": clean_reply(output_text)}
+    return {"enhanced": strip_style_prefix(str(result.get("enhanced", "")))}
+
+
+def translation_prompt(text, language_name):
+    return (
+        f"Translate the following English text to {language_name}:\n\n{text}\n\n"
+        "Respond ONLY in JSON format like this:\n"
+        '{ "translated": "<translated text>", "language": "' + language_name + '" }'
+    )
+
+
+def shape_translation(output_text, language_name):
+    return parse_json_reply(output_text) or {"translated": clean_reply(output_text), "language": language_name}
+
+
+def shape_chatbot(output_text):
+    result = parse_json_reply(output_text)
+    if result:
+        return result.get("corrected") or result.get("reply") or clean_reply(output_text)
+    return clean_reply(output_text)
+
+
+def pipeline_prompt(text, style=None, language_name=None):
+    """One prompt that corrects, restyles and translates a signed sentence in a single generation"""
+    steps = ["Correct the grammar of the sentence."]
+    keys = ['"corrected": "<corrected sentence>"']
+    if style:
+        steps.append(f"Rewrite the corrected sentence in the style of '{style}'.")
+        keys.append('"enhanced": "<sentence rewritten in selected style>"')
+    if language_name:
+        source = "rewritten" if style else "corrected"
+        steps.append(f"Translate the {source} sentence to {language_name}.")
+        keys.append('"translated": "<translated text>"')
+    numbered = "\n".join(f"{i}. {step}" for i, step in enumerate(steps, 1))
+    return (
+        f"{numbered}\n\n"
+        f"Sentence: {text}\n\n"
+        "Respond ONLY in JSON format like this:\n"
+        "{ " + ", ".join(keys) + " }"
+    )
+
+
+def shape_pipeline(output_text, style=None, language_name=None):
+    """Parse a pipeline reply; returns None if any requested stage is missing"""
+    result = parse_json_reply(output_text)
+    if not result or not result.get("corrected"):
+        return None
+    shaped = {"corrected": str(result["corrected"]).strip()}
+    if style:
+        if not result.get("enhanced"):
+            return None
+        shaped["enhanced"] = strip_style_prefix(str(result["enhanced"]))
+    if language_name:
+        if not result.get("translated"):
+            return None
+        shaped["translated"] = str(result["translated"]).strip()
+        shaped["language"] = language_name
+    return shaped
@@ -0,0 +1,128 @@
+import functools
+import math
+
+# /detect stages run from well under a millisecond (format) to a few hundred ms (CPU inference)
+DETECT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0)
+TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 20, 40, 80, 160)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Metrics:
+    """Prometheus histograms, counters and gauges for the hot paths, rendered at /metrics.
+
+    Recording a sample is one bucket increment; gauges are callbacks evaluated only when
+    /metrics is scraped. Disabled (every method a no-op) when `enabled` is false or
+    prometheus_client is not installed. Each worker process keeps its own numbers.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        if not enabled:
+            return
+        try:
+            import prometheus_client as prom
+        except ImportError as e:
+            print("[WARN] prometheus_client not installed, /metrics disabled:", e)
+            self.enabled = False
+            return
+        self._prom = prom
+        self.registry = prom.CollectorRegistry()
+        self.detect_seconds = prom.Histogram(
+            "signverse_detect_stage_seconds", "Time spent per /detect pipeline stage",
+            ["stage"], buckets=DETECT_BUCKETS, registry=self.registry)
+        self.detect_frames = prom.Counter(
+            "signverse_detect_frames_total", "Frames handled by /detect by response status",
+            ["status"], registry=self.registry)
+        self.forward_seconds = prom.Histogram(
+            "signverse_yolo_forward_seconds", "YOLO forward pass time per micro-batch",
+            ["backend"], buckets=DETECT_BUCKETS, registry=self.registry)
+        self.forward_frames = prom.Histogram(
+            "signverse_yolo_batch_frames", "Frames per YOLO forward pass",
+            ["backend"], buckets=(1, 2, 4, 8, 16, 32), registry=self.registry)
+        self.llm_seconds = prom.Histogram(
+            "signverse_ollama_request_seconds", "Ollama request latency, excluding time queued for a slot",
+            ["model", "endpoint", "api"], buckets=LLM_BUCKETS, registry=self.registry)
+        self.llm_token_rate = prom.Histogram(
+            "signverse_ollama_tokens_per_second", "Ollama generation speed (eval_count / eval_duration)",
+            ["model", "endpoint", "api"], buckets=TOKEN_RATE_BUCKETS, registry=self.registry)
+        self.llm_tokens = prom.Counter(
+            "signverse_ollama_tokens_total", "Tokens generated by Ollama",
+            ["model", "endpoint", "api"], registry=self.registry)
+        self.query_seconds = prom.Histogram(
+            "signverse_mysql_query_seconds", "MySQL statement time per Flask route",
+            ["route"], buckets=QUERY_BUCKETS, registry=self.registry)
+        self.socketio_events = prom.Counter(
+            "signverse_socketio_events_total", "Socket.IO events received by event type",
+            ["event"], registry=self.registry)
+
+    def observe_detect(self, timings, status):
+        if not self.enabled:
+            return
+        for stage, seconds in timings.items():
+            self.detect_seconds.labels(stage).observe(seconds)
+        self.detect_frames.labels(str(status)).inc()
+
+    def observe_forward(self, backend, frames, seconds):
+        if not self.enabled:
+            return
+        self.forward_seconds.labels(backend).observe(seconds)
+        self.forward_frames.labels(backend).observe(frames)
+
+    def observe_llm(self, model, endpoint, api, seconds, eval_count=None, eval_duration=None):
+        """One finished Ollama call for app `endpoint` (job kind) over Ollama path `api`.
+
+        `eval_count`/`eval_duration` (ns) come from its final response chunk.
+        """
+        if not self.enabled:
+            return
+        self.llm_seconds.labels(model, endpoint, api).observe(seconds)
+        if eval_count:
+            self.llm_tokens.labels(model, endpoint, api).inc(eval_count)
+            if eval_duration:
+                self.llm_token_rate.labels(model, endpoint, api).observe(eval_count / (eval_duration / 1e9))
+
+    def observe_query(self, route, seconds):
+        if not self.enabled:
+            return
+        self.query_seconds.labels(route).observe(seconds)
+
+    def gauge(self, name, documentation, read):
+        """Gauge whose value is `read()` at scrape time (NaN if it raises, e.g. Redis is down)"""
+        if not self.enabled:
+            return
+
+        def value():
+            try:
+                result = read()
+            except Exception:
+                return math.nan
+            return math.nan if result is None else result
+
+        self._prom.Gauge(name, documentation, registry=self.registry).set_function(value)
+
+    def instrument_socketio(self, socketio):
+        """Count every event handled by handlers registered through `socketio.on` from now on"""
+        if not self.enabled:
+            return
+        register = socketio.on
+        counter = self.socketio_events
+
+        def on(message, namespace=None):
+            decorator = register(message, namespace)
+            events = counter.labels(message)
+
+            def wrap(handler):
+                @functools.wraps(handler)
+                def counted(*args, **kwargs):
+                    events.inc()
+                    return handler(*args, **kwargs)
+                return decorator(counted)
+            return wrap
+
+        socketio.on = on
+
+    def render(self):
+        """(body, content type) in the Prometheus text exposition format"""
+        return self._prom.generate_latest(self.registry), self._prom.CONTENT_TYPE_LATEST
+
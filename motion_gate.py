@@ -0,0 +1,55 @@
+import threading
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Skips inference when a frame is effectively unchanged from the last one inferred for a session.
+
+    Frames are compared as tiny grayscale thumbnails (mean absolute difference in
+    0-255 units). A reused result is only trusted for `max_reuse_seconds` after the
+    frame it came from was actually inferred, so held signs keep being re-checked.
+    """
+
+    def __init__(self, enabled=True, threshold=3.0, max_reuse_seconds=0.5, size=32):
+        self.enabled = enabled
+        self.threshold = float(threshold)
+        self.max_reuse_seconds = float(max_reuse_seconds)
+        self.size = int(size)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def thumbnail(self, image):
+        small = cv2.resize(image, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def lookup(self, sign_session, thumb, now):
+        """Return the cached pick for this session if `thumb` matches the last inferred frame, else None"""
+        cached = sign_session.last_inferred
+        hit = (
+            cached is not None
+            and now - cached[2] <= self.max_reuse_seconds
+            and float(np.abs(thumb - cached[0]).mean()) <= self.threshold
+        )
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return cached[1] if hit else None
+
+    def store(self, sign_session, thumb, picked, now):
+        sign_session.last_inferred = (thumb, picked, now)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "threshold": self.threshold,
+            "max_reuse_seconds": self.max_reuse_seconds,
+        }
@@ -0,0 +1,136 @@
+import io
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+
+PAD_VALUE = 114  # same grey Ultralytics uses for letterbox padding
+
+
+class PreparedFrame:
+    """A letterboxed model input plus what is needed to map boxes back to the original frame"""
+
+    __slots__ = ("image", "imgsz", "orig_w", "orig_h", "scale", "pad_x", "pad_y",
+                 "offset_x", "offset_y", "_pool_slot")
+
+    def __init__(self, image, orig_w, orig_h, scale, pad_x, pad_y, offset_x=0.0, offset_y=0.0, pool_slot=None):
+        self.image = image
+        self.imgsz = image.shape[0]
+        self.orig_w = orig_w
+        self.orig_h = orig_h
+        self.scale = scale  # letterbox pixels per original-frame pixel
+        self.pad_x = pad_x
+        self.pad_y = pad_y
+        self.offset_x = offset_x  # top-left of the crop, in original-frame pixels
+        self.offset_y = offset_y
+        self._pool_slot = pool_slot
+
+    def to_original(self, xyxy):
+        """Map an (x1, y1, x2, y2) box from letterbox space back to original-frame pixels"""
+        x1, y1, x2, y2 = xyxy
+        x1 = min(max((x1 - self.pad_x) / self.scale + self.offset_x, 0.0), self.orig_w)
+        x2 = min(max((x2 - self.pad_x) / self.scale + self.offset_x, 0.0), self.orig_w)
+        y1 = min(max((y1 - self.pad_y) / self.scale + self.offset_y, 0.0), self.orig_h)
+        y2 = min(max((y2 - self.pad_y) / self.scale + self.offset_y, 0.0), self.orig_h)
+        return x1, y1, x2, y2
+
+
+class DecodedFrame:
+    """A frame decoded at reduced scale, remembering its original size"""
+
+    __slots__ = ("pixels", "orig_w", "orig_h")
+
+    def __init__(self, pixels, orig_w, orig_h):
+        self.pixels = pixels
+        self.orig_w = orig_w
+        self.orig_h = orig_h
+
+
+class FramePreprocessor:
+    """Decodes encoded frames straight to BGR arrays at reduced scale and letterboxes them.
+
+    JPEGs are decoded with OpenCV's IMREAD_REDUCED_* flags, which downscale by 2/4/8
+    in the DCT domain, so a 1080p frame never gets fully decoded when the model only
+    needs 640px. Letterboxed outputs are written into pools of preallocated buffers
+    (one pool per input size); call `release()` once the model is done with a frame.
+    """
+
+    _REDUCED = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+    def __init__(self, imgsz=640, pool_size=16):
+        self.imgsz = int(imgsz)
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._free = {self.imgsz: [self._new_slot(self.imgsz) for _ in range(pool_size)]}
+
+    def _new_slot(self, size):
+        # [buffer, geometry of the last letterbox written into it]
+        return [np.full((size, size, 3), PAD_VALUE, dtype=np.uint8), None]
+
+    def decode(self, data):
+        """Decode encoded image bytes to a DecodedFrame, downscaling as far as the model input allows"""
+        with Image.open(io.BytesIO(data)) as probe:  # reads the header only
+            orig_w, orig_h = probe.size
+
+        flag = cv2.IMREAD_COLOR
+        for factor, reduced in self._REDUCED:
+            if max(orig_w, orig_h) // factor >= self.imgsz:
+                flag = reduced
+                break
+
+        arr = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+        if arr is None:
+            raise ValueError("could not decode image")
+        return DecodedFrame(arr, orig_w, orig_h)
+
+    def letterbox(self, decoded, imgsz=None, roi=None):
+        """Letterbox the whole frame, or the `roi` (x1, y1, x2, y2 in original pixels), to `imgsz`"""
+        size = int(imgsz or self.imgsz)
+        src = decoded.pixels
+        src_h, src_w = src.shape[:2]
+        # Decoded pixels per original-frame pixel
+        decode_scale = src_w / decoded.orig_w
+
+        offset_x = offset_y = 0.0
+        if roi is not None:
+            cx1 = max(0, int(roi[0] * decode_scale))
+            cy1 = max(0, int(roi[1] * decode_scale))
+            cx2 = min(src_w, int(np.ceil(roi[2] * decode_scale)))
+            cy2 = min(src_h, int(np.ceil(roi[3] * decode_scale)))
+            if cx2 - cx1 > 1 and cy2 - cy1 > 1:
+                src = src[cy1:cy2, cx1:cx2]
+                src_h, src_w = src.shape[:2]
+                offset_x, offset_y = cx1 / decode_scale, cy1 / decode_scale
+
+        ratio = min(size / src_w, size / src_h)
+        new_w, new_h = max(1, round(src_w * ratio)), max(1, round(src_h * ratio))
+        pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+
+        with self._lock:
+            free = self._free.setdefault(size, [])
+            slot = free.pop() if free else self._new_slot(size)
+        buf, geometry = slot
+
+        if geometry != (new_w, new_h, pad_x, pad_y):
+            buf.fill(PAD_VALUE)
+            slot[1] = (new_w, new_h, pad_x, pad_y)
+        interp = cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR
+        buf[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(src, (new_w, new_h), interpolation=interp)
+
+        # Overall scale from original-frame pixels to letterbox pixels
+        scale = ratio * decode_scale
+        return PreparedFrame(buf, decoded.orig_w, decoded.orig_h, scale, pad_x, pad_y, offset_x, offset_y, slot)
+
+    def prepare(self, data):
+        return self.letterbox(self.decode(data))
+
+    def release(self, frame):
+        slot = frame._pool_slot
+        if slot is None:
+            return
+        frame._pool_slot = None
+        with self._lock:
+            free = self._free.setdefault(frame.imgsz, [])
+            if len(free) < self.pool_size:
+                free.append(slot)
@@ -0,0 +1,194 @@
+"""Post-training static INT8 quantization of the sign detector (ONNX Runtime).
+
+The FP32 ONNX export from `backends.export_artifact` is calibrated on a directory of
+sample frames and quantized to QDQ INT8. `compare_models` produces the accuracy /
+latency report used both by the CLI and by the app's load-time guardrail.
+
+    python quantize.py --calib fixtures/calib --eval fixtures/eval --report quant_report.json
+
+An eval directory may hold one sub-directory per class name (A/, B/, 7/, ...) for
+ground-truth precision; a flat directory is scored against the FP32 predictions. It must
+be held out from the calibration set: frames the quantizer was fitted on say nothing about
+accuracy.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from backends import IMAGE_EXTS, export_artifact, weights_hash
+from preprocess import FramePreprocessor
+
+
+def _frame_files(frame_dir):
+    found = []
+    for root, _, files in os.walk(frame_dir):
+        found.extend(os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTS))
+    return sorted(found)
+
+
+def _calib_hash(files):
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(os.path.basename(path).encode())
+        digest.update(str(os.path.getsize(path)).encode())
+    return digest.hexdigest()[:8]
+
+
+def _to_input(frame):
+    # Letterboxed BGR HWC uint8 -> RGB NCHW float32 in [0, 1], as Ultralytics feeds the exported graph
+    return np.ascontiguousarray(frame.image[..., ::-1].transpose(2, 0, 1))[None].astype(np.float32) / 255.0
+
+
+def _make_reader(files, input_name, imgsz):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class FrameCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self.pending = list(files)
+            self.pre = FramePreprocessor(imgsz=imgsz, pool_size=1)
+
+        def get_next(self):
+            while self.pending:
+                with open(self.pending.pop(), "rb") as f:
+                    data = f.read()
+                try:
+                    frame = self.pre.prepare(data)
+                except Exception:
+                    continue
+                x = _to_input(frame)
+                self.pre.release(frame)
+                return {input_name: x}
+            return None
+
+    return FrameCalibrationReader()
+
+
+def quantized_artifact(weights, calib_dir, imgsz=640, cache_dir="models/exported", max_frames=300):
+    """Return the path of the INT8 ONNX model for `weights`, quantizing it on first use"""
+    import onnx
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    if not calib_dir:
+        raise ValueError("INT8 quantization needs a calibration directory of sample frames")
+    files = _frame_files(calib_dir)[:max_frames]
+    if not files:
+        raise ValueError(f"No calibration frames found in {calib_dir}")
+
+    fp32_path = export_artifact(weights, "onnx", imgsz, cache_dir)
+    target_dir = os.path.join(cache_dir, f"{weights_hash(weights)}-onnx-int8-{imgsz}-{_calib_hash(files)}")
+    int8_path = os.path.join(target_dir, os.path.basename(fp32_path).replace(".onnx", "-int8.onnx"))
+    if os.path.exists(int8_path):
+        return int8_path
+
+    os.makedirs(target_dir, exist_ok=True)
+    input_name = ort.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    quantize_static(
+        fp32_path, int8_path, _make_reader(files, input_name, imgsz),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+
+    # Keep the Ultralytics metadata (class names, stride, imgsz) so YOLO() can load the result
+    src, dst = onnx.load(fp32_path), onnx.load(int8_path)
+    del dst.metadata_props[:]
+    dst.metadata_props.extend(src.metadata_props)
+    onnx.save(dst, int8_path)
+    return int8_path
+
+
+def _predict(model, path, imgsz):
+    import cv2
+
+    img = cv2.imread(path)
+    started = time.perf_counter()
+    result = model(img, imgsz=imgsz, verbose=False)[0]
+    elapsed = time.perf_counter() - started
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return None, elapsed
+    best = int(np.argmax(boxes.conf.cpu().numpy()))
+    return model.names[int(boxes.cls.cpu().numpy()[best])], elapsed
+
+
+def _latency(samples):
+    ms = np.array(samples) * 1000.0
+    if not len(ms):
+        return {}
+    return {"mean_ms": round(float(ms.mean()), 2), "p50_ms": round(float(np.percentile(ms, 50)), 2),
+            "p95_ms": round(float(np.percentile(ms, 95)), 2)}
+
+
+def _precision(preds, truth):
+    per_class = {}
+    for cls in sorted({p for p in preds if p is not None}, key=str):
+        picked = [t for p, t in zip(preds, truth) if p == cls]
+        per_class[str(cls)] = round(sum(t == cls for t in picked) / len(picked), 4)
+    return per_class
+
+
+def require_held_out(eval_dir, calib_dir):
+    """Raise ValueError unless `eval_dir` is given and shares no frames with `calib_dir`"""
+    if not eval_dir:
+        raise ValueError("INT8 accuracy needs a held-out eval directory, separate from the calibration frames")
+    calib = {os.path.realpath(p) for p in _frame_files(calib_dir)} if calib_dir else set()
+    shared = [p for p in _frame_files(eval_dir) if os.path.realpath(p) in calib]
+    if shared:
+        raise ValueError(f"{len(shared)} eval frames are also calibration frames; use a held-out set")
+
+
+def compare_models(fp32, int8, eval_dir, imgsz=640):
+    """Top-1 agreement, per-class precision and latency of `int8` against `fp32` on `eval_dir`"""
+    files = _frame_files(eval_dir)
+    fp32_preds, int8_preds, fp32_times, int8_times, truth = [], [], [], [], []
+    for path in files:
+        label, elapsed = _predict(fp32, path, imgsz)
+        fp32_preds.append(label)
+        fp32_times.append(elapsed)
+        label, elapsed = _predict(int8, path, imgsz)
+        int8_preds.append(label)
+        int8_times.append(elapsed)
+        parent = os.path.basename(os.path.dirname(path))
+        truth.append(parent if os.path.dirname(path) != os.path.normpath(eval_dir) else None)
+
+    labelled = all(t is not None for t in truth) and bool(truth)
+    reference = truth if labelled else fp32_preds
+    agreement = sum(a == b for a, b in zip(fp32_preds, int8_preds)) / len(files) if files else 0.0
+    return {
+        "frames": len(files),
+        "ground_truth": "directory labels" if labelled else "fp32 predictions",
+        "top1_agreement": round(agreement, 4),
+        "precision": {"fp32": _precision(fp32_preds, reference), "int8": _precision(int8_preds, reference)},
+        "latency": {"fp32": _latency(fp32_times), "int8": _latency(int8_times)},
+    }
+
+
+if __name__ == "__main__":
+    from ultralytics import YOLO
+
+    parser = argparse.ArgumentParser(description="Quantize the sign detector to INT8 and report accuracy/latency")
+    parser.add_argument("--weights", default="models/best_m_train.pt")
+    parser.add_argument("--calib", required=True, help="Directory of sample frames for calibration")
+    parser.add_argument("--eval", required=True, help="Held-out directory of frames to compare on (not --calib)")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--cache-dir", default="models/exported")
+    parser.add_argument("--report", help="Write the JSON report to this path")
+    args = parser.parse_args()
+    try:
+        require_held_out(args.eval, args.calib)
+    except ValueError as e:
+        parser.error(str(e))
+
+    path = quantized_artifact(args.weights, args.calib, args.imgsz, args.cache_dir)
+    print("INT8 model:", path)
+    report = compare_models(YOLO(args.weights), YOLO(path, task="detect"), args.eval, args.imgsz)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
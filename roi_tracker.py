@@ -0,0 +1,66 @@
+import threading
+
+
+class RoiTracker:
+    """Runs follow-up frames on an expanded crop around the last confident hand box.
+
+    After a detection with conf >= `min_conf` the next frames are inferred on a square
+    crop `expand` times the size of that box, at the smaller `imgsz`. A miss on the crop,
+    or `refresh_every` consecutive crop frames, sends the session back to a full-frame pass.
+    """
+
+    def __init__(self, enabled=True, imgsz=320, expand=1.8, min_conf=0.5, refresh_every=15):
+        self.enabled = enabled
+        self.imgsz = int(imgsz)
+        self.expand = float(expand)
+        self.min_conf = float(min_conf)
+        self.refresh_every = int(refresh_every)
+        self._lock = threading.Lock()
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.roi_misses = 0
+
+    def plan(self, sign_session):
+        """Return the crop box to infer on for this session's next frame, or None for a full frame"""
+        if not self.enabled or sign_session.roi_box is None or sign_session.roi_age >= self.refresh_every:
+            return None
+        return sign_session.roi_box
+
+    def crop_for(self, bbox, orig_w, orig_h):
+        """Square crop `expand` times the box size, centred on it and clipped to the frame"""
+        x1, y1, x2, y2 = bbox
+        side = max(x2 - x1, y2 - y1) * self.expand
+        cx, cy = (x1 + x2) / 2.0, (y1 + y2) / 2.0
+        return (max(0.0, cx - side / 2.0), max(0.0, cy - side / 2.0),
+                min(float(orig_w), cx + side / 2.0), min(float(orig_h), cy + side / 2.0))
+
+    def update(self, sign_session, picked, roi, orig_w, orig_h):
+        """Record the outcome of a pass; `roi` is the crop that was used (None for a full frame)"""
+        label, conf, bbox = picked[:3]
+        with self._lock:
+            if roi is None:
+                self.full_frames += 1
+            else:
+                self.roi_frames += 1
+                if not label:
+                    self.roi_misses += 1
+
+        if not self.enabled:
+            return
+        if label and bbox and conf is not None and conf >= self.min_conf:
+            sign_session.roi_box = self.crop_for(bbox, orig_w, orig_h)
+            sign_session.roi_age = sign_session.roi_age + 1 if roi is not None else 0
+        else:
+            sign_session.roi_box = None
+            sign_session.roi_age = 0
+
+    def stats(self):
+        total = self.roi_frames + self.full_frames
+        return {
+            "enabled": self.enabled,
+            "roi_frames": self.roi_frames,
+            "full_frames": self.full_frames,
+            "roi_misses": self.roi_misses,
+            "roi_ratio": round(self.roi_frames / total, 4) if total else 0.0,
+            "imgsz": self.imgsz,
+        }
@@ -0,0 +1,241 @@
+import os
+import threading
+import time
+
+
+class MemoryRoomStore:
+    """Room membership for a single process: room -> {sid: username} plus a sid -> rooms index"""
+
+    def __init__(self):
+        self._rooms = {}
+        self._by_sid = {}
+        self._lock = threading.Lock()
+
+    def add(self, room, sid, username):
+        with self._lock:
+            self._rooms.setdefault(room, {})[sid] = username
+            self._by_sid.setdefault(sid, set()).add(room)
+            return set(self._rooms[room].values())
+
+    def remove(self, room, sid):
+        with self._lock:
+            members = self._rooms.get(room)
+            username = members.pop(sid, None) if members is not None else None
+            if members is not None and not members:
+                del self._rooms[room]
+            rooms = self._by_sid.get(sid)
+            if rooms is not None:
+                rooms.discard(room)
+                if not rooms:
+                    del self._by_sid[sid]
+            return username
+
+    def rooms_of(self, sid):
+        with self._lock:
+            return set(self._by_sid.get(sid, ()))
+
+    def members(self, room):
+        with self._lock:
+            return set(self._rooms.get(room, {}).values())
+
+    def counts(self):
+        with self._lock:
+            return {room: (len(members), len(set(members.values()))) for room, members in self._rooms.items()}
+
+
+class RedisRoomStore:
+    """Room membership shared by every worker.
+
+    Each room is a sorted set of sids scored by their last heartbeat, plus a hash of
+    sid -> username. The worker that owns a connection refreshes its entries every
+    `ttl / 3` seconds (see `heartbeat()`); entries that stop being refreshed, e.g. because
+    their worker crashed, are dropped once they are `ttl` seconds old, and the keys expire.
+    """
+
+    def __init__(self, url, prefix="signverse:rooms:", ttl=60.0):
+        import redis
+        self.redis = redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0, decode_responses=True)
+        self.prefix = prefix
+        self.ttl = ttl
+        self.heartbeat_interval = ttl / 3
+        self._lock = threading.Lock()
+        self._owned = {}  # sid -> rooms joined through this worker
+
+    def _room_key(self, room):
+        return f"{self.prefix}room:{room}"
+
+    def _names_key(self, room):
+        return f"{self.prefix}names:{room}"
+
+    def _sid_key(self, sid):
+        return f"{self.prefix}sid:{sid}"
+
+    def _live(self, room):
+        """Drop entries whose heartbeat lapsed; returns the remaining usernames"""
+        cutoff = time.time() - self.ttl
+        stale = self.redis.zrangebyscore(self._room_key(room), "-inf", cutoff)
+        if stale:
+            pipe = self.redis.pipeline()
+            pipe.zrem(self._room_key(room), *stale)
+            pipe.hdel(self._names_key(room), *stale)
+            pipe.execute()
+        return self.redis.hvals(self._names_key(room))
+
+    def add(self, room, sid, username):
+        with self._lock:
+            self._owned.setdefault(sid, set()).add(room)
+        ttl = int(self.ttl)
+        pipe = self.redis.pipeline()
+        pipe.zadd(self._room_key(room), {sid: time.time()})
+        pipe.hset(self._names_key(room), sid, username)
+        pipe.sadd(self._sid_key(sid), room)
+        pipe.sadd(self.prefix + "all", room)
+        for key in (self._room_key(room), self._names_key(room), self._sid_key(sid)):
+            pipe.expire(key, ttl)
+        pipe.execute()
+        return set(self._live(room))
+
+    def remove(self, room, sid):
+        with self._lock:
+            rooms = self._owned.get(sid)
+            if rooms is not None:
+                rooms.discard(room)
+                if not rooms:
+                    del self._owned[sid]
+        pipe = self.redis.pipeline()
+        pipe.hget(self._names_key(room), sid)
+        pipe.zrem(self._room_key(room), sid)
+        pipe.hdel(self._names_key(room), sid)
+        pipe.srem(self._sid_key(sid), room)
+        pipe.zcard(self._room_key(room))
+        username, _, _, _, remaining = pipe.execute()
+        if not remaining:
+            self.redis.srem(self.prefix + "all", room)
+        return username
+
+    def rooms_of(self, sid):
+        return set(self.redis.smembers(self._sid_key(sid)))
+
+    def members(self, room):
+        return set(self._live(room))
+
+    def counts(self):
+        counts = {}
+        for room in self.redis.smembers(self.prefix + "all"):
+            members = self._live(room)
+            if members:
+                counts[room] = (len(members), len(set(members)))
+            else:
+                self.redis.srem(self.prefix + "all", room)
+        return counts
+
+    def heartbeat(self):
+        """Refresh the score and key TTLs of every membership this worker owns"""
+        with self._lock:
+            owned = [(sid, set(rooms)) for sid, rooms in self._owned.items()]
+        if not owned:
+            return
+        now = time.time()
+        ttl = int(self.ttl)
+        pipe = self.redis.pipeline()
+        for sid, rooms in owned:
+            pipe.expire(self._sid_key(sid), ttl)
+            for room in rooms:
+                pipe.zadd(self._room_key(room), {sid: now}, xx=True)
+                pipe.expire(self._room_key(room), ttl)
+                pipe.expire(self._names_key(room), ttl)
+        pipe.execute()
+
+
+class RoomRegistry:
+    """Who is in which video-call room, keyed by Socket.IO connection.
+
+    Membership is per connection (sid), so a user with two tabs stays listed until both
+    leave, and a dropped connection is cleaned up on disconnect instead of lingering.
+    With `socketio` given and a store that needs it, the store's heartbeat runs as a
+    background task.
+    """
+
+    def __init__(self, store, socketio=None):
+        self.store = store
+        self.joins = 0
+        self.leaves = 0
+        self.disconnect_cleanups = 0
+        if socketio is not None and hasattr(store, "heartbeat"):
+            socketio.start_background_task(self._heartbeat_forever, socketio.sleep)
+
+    def _heartbeat_forever(self, sleep):
+        while True:
+            sleep(self.store.heartbeat_interval)
+            try:
+                self.store.heartbeat()
+            except Exception as e:
+                print("[WARN] Room heartbeat failed:", e)
+
+    def join(self, room, sid, username):
+        """Add a connection to a room; returns the other usernames already there"""
+        members = self.store.add(room, sid, username)
+        self.joins += 1
+        return sorted(members - {username})
+
+    def leave(self, room, sid):
+        """Remove a connection from a room.
+
+        Returns (username, last): username is None if the connection wasn't there, and
+        `last` is True when the user has no other connection left in the room.
+        """
+        username = self.store.remove(room, sid)
+        if username is None:
+            return None, False
+        self.leaves += 1
+        return username, username not in self.store.members(room)
+
+    def disconnect(self, sid):
+        """Remove a dropped connection from every room.
+
+        Returns [(room, username), ...] for the rooms the user has now left entirely; rooms
+        where the same user is still connected from another tab are not listed.
+        """
+        left = []
+        removed = False
+        for room in self.store.rooms_of(sid):
+            username = self.store.remove(room, sid)
+            if username is not None:
+                removed = True
+                if username not in self.store.members(room):
+                    left.append((room, username))
+        if removed:
+            self.disconnect_cleanups += 1
+        return left
+
+    def members(self, room):
+        return sorted(self.store.members(room))
+
+    def stats(self, top=20):
+        counts = self.store.counts()
+        busiest = sorted(counts.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        return {
+            "store": type(self.store).__name__,
+            "rooms": len(counts),
+            "connections": sum(c for c, _ in counts.values()),
+            "members": sum(m for _, m in counts.values()),
+            "joins": self.joins,
+            "leaves": self.leaves,
+            "disconnect_cleanups": self.disconnect_cleanups,
+            "busiest": {room: {"connections": c, "members": m} for room, (c, m) in busiest},
+        }
+
+
+def room_registry_from_env(socketio=None):
+    """RoomRegistry from ROOM_STORE (defaults to Redis when SOCKETIO_MESSAGE_QUEUE is set, i.e. several workers)"""
+    message_queue = os.getenv("SOCKETIO_MESSAGE_QUEUE")
+    backend = os.getenv("ROOM_STORE") or ("redis" if message_queue else "memory")
+    if backend == "redis":
+        try:
+            store = RedisRoomStore(os.getenv("ROOM_REDIS_URL") or message_queue or "redis://localhost:6379/0",
+                                   ttl=float(os.getenv("ROOM_TTL_SECONDS") or 60))
+            store.redis.ping()
+            return RoomRegistry(store, socketio)
+        except Exception as e:
+            print("[WARN] Redis room store unavailable, using process memory:", e)
+    return RoomRegistry(MemoryRoomStore())
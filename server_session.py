@@ -0,0 +1,253 @@
+"""Server-side Flask sessions: the cookie carries only a signed session id.
+
+Backends: "memory" (one process; swept for expired sessions), "filesystem" (shared by the
+workers on one host) and "redis" (shared by every host). "cookie" keeps Flask's default
+signed-cookie sessions.
+"""
+import os
+import secrets
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+SESSION_BACKENDS = ("cookie", "memory", "filesystem", "redis")
+
+_serializer = TaggedJSONSerializer()
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class MemorySessionStore:
+    """Sessions in a dict of sid -> (expires_at, payload); expired entries are swept periodically"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+        if entry is None or entry[0] < time.time():
+            return None
+        return entry[1]
+
+    def set(self, sid, payload, ttl):
+        with self._lock:
+            self._entries[sid] = (time.time() + ttl, payload)
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (expires_at, _) in self._entries.items() if expires_at < now]
+            for sid in expired:
+                del self._entries[sid]
+        return len(expired)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileSessionStore:
+    """One file per session under `directory`; the file's mtime is its expiry time"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sid):
+        return os.path.join(self.directory, sid)
+
+    def get(self, sid):
+        path = self._path(sid)
+        try:
+            if os.path.getmtime(path) < time.time():
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, sid, payload, ttl):
+        path = self._path(sid)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(payload)
+        expires_at = time.time() + ttl
+        os.utime(tmp, (expires_at, expires_at))
+        os.replace(tmp, path)
+
+    def delete(self, sid):
+        try:
+            os.remove(self._path(sid))
+        except OSError:
+            pass
+
+    def sweep(self):
+        now = time.time()
+        removed = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < now:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def __len__(self):
+        return sum(1 for _ in os.scandir(self.directory))
+
+
+class RedisSessionStore:
+    """Sessions as Redis strings; Redis expires them, so there is nothing to sweep"""
+
+    def __init__(self, url, prefix="signverse:session:"):
+        import redis
+        self.redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.prefix = prefix
+
+    def get(self, sid):
+        raw = self.redis.get(self.prefix + sid)
+        return raw.decode("utf-8") if raw is not None else None
+
+    def set(self, sid, payload, ttl):
+        self.redis.set(self.prefix + sid, payload, ex=int(ttl))
+
+    def delete(self, sid):
+        self.redis.delete(self.prefix + sid)
+
+    def sweep(self):
+        return 0
+
+
+class ServerSessionInterface(SessionInterface):
+    """Loads and saves sessions through `store`; the cookie holds only the signed sid.
+
+    Requests that don't touch the session (e.g. /detect frames) cost one store lookup and
+    send no Set-Cookie back.
+    """
+
+    def __init__(self, store, sweep_interval=300):
+        self.store = store
+        self.loads = 0
+        self.saves = 0
+        self.save_errors = 0
+        if sweep_interval and not isinstance(store, RedisSessionStore):
+            threading.Thread(target=self._sweep_forever, args=(sweep_interval,),
+                             name="session-sweeper", daemon=True).start()
+
+    def _sweep_forever(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.store.sweep()
+            except Exception as e:
+                print("[WARN] Session sweep failed:", e)
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt="signverse-session")
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode("ascii")
+            except BadSignature:
+                sid = None
+            if sid:
+                try:
+                    payload = self.store.get(sid)
+                except Exception as e:
+                    print("[WARN] Session load failed:", e)
+                    payload = None
+                self.loads += 1
+                if payload is not None:
+                    try:
+                        return ServerSession(_serializer.loads(payload), sid=sid)
+                    except ValueError:
+                        pass
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                try:
+                    self.store.delete(session.sid)
+                except Exception as e:
+                    # The cookie is still cleared; the stored copy expires on its own
+                    print("[WARN] Session delete failed:", e)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified and not self.should_set_cookie(app, session):
+            return
+
+        ttl = app.permanent_session_lifetime.total_seconds()
+        try:
+            self.store.set(session.sid, _serializer.dumps(dict(session)), ttl)
+        except Exception as e:
+            # Serve the response anyway; this request's session changes are lost
+            print("[WARN] Session save failed:", e)
+            self.save_errors += 1
+            return
+        self.saves += 1
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid.encode("ascii")).decode("ascii"),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    def stats(self):
+        return {
+            "backend": type(self.store).__name__,
+            "sessions": len(self.store) if hasattr(self.store, "__len__") else None,
+            "loads": self.loads,
+            "saves": self.saves,
+            "save_errors": self.save_errors,
+        }
+
+
+def init_server_session(app, backend="filesystem", directory="flask_session", redis_url=None, sweep_interval=300):
+    """Install a server-side session backend on `app`; returns the interface (None for "cookie")"""
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown session backend '{backend}'")
+    if backend == "cookie":
+        return None
+    if backend == "redis":
+        try:
+            store = RedisSessionStore(redis_url or "redis://localhost:6379/0")
+            store.redis.ping()
+        except Exception as e:
+            print("[WARN] Redis session store unavailable, using the filesystem:", e)
+            store = FileSessionStore(directory)
+    elif backend == "filesystem":
+        store = FileSessionStore(directory)
+    else:
+        store = MemorySessionStore()
+    app.session_interface = ServerSessionInterface(store, sweep_interval)
+    return app.session_interface
@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+
+# Hold / pause timings driving the sign-to-text state machine (seconds)
+SignTimings = namedtuple("SignTimings", "hold space_after comma_after fullstop_after accept_cooldown")
+
+
+class SignSession:
+    """Sign-to-text state for one browser/stream: char buffer, sentence and hold/pause timers"""
+
+    __slots__ = (
+        "session_id", "timings", "lock", "last_seen",
+        "char_buffer", "sentence", "hand_present",
+        "last_label", "label_start_time",
+        "last_accepted_label", "last_accepted_time",
+        "space_added", "comma_added", "fullstop_added",
+        "last_hand_time", "pause_detection",
+        "last_inferred", "roi_box", "roi_age", "score_ring",
+    )
+
+    def __init__(self, session_id, timings):
+        self.session_id = session_id
+        self.timings = timings
+        self.lock = threading.Lock()
+        self.last_seen = time.time()
+        self.char_buffer = deque(maxlen=256)
+        self.sentence = ""
+        self.last_inferred = None  # (thumbnail, picked label, time) for the motion gate
+        self.roi_box = None  # hand crop for the next frame, see RoiTracker
+        self.roi_age = 0
+        self.score_ring = None  # recent class scores, see LabelSmoother
+        self.reset()
+
+    def reset(self):
+        self.sentence = ""
+        self.char_buffer.clear()
+        self.pause_detection = False
+        self.resume()
+        self.label_start_time = 0.0
+        self.comma_added = False
+        self.last_hand_time = time.time()
+        self.last_inferred = None
+        self.roi_box = None
+        self.roi_age = 0
+
+    def resume(self):
+        """Clear hold/pause timers so detection starts fresh"""
+        self.score_ring = None
+        self.last_label = None
+        self.label_start_time = time.time()
+        self.last_accepted_label = None
+        self.last_accepted_time = 0.0
+        self.space_added = False
+        self.fullstop_added = False
+        self.hand_present = False
+
+    def set_sentence(self, sentence, pause=True):
+        self.sentence = sentence
+        self.pause_detection = pause
+        if not pause:
+            self.resume()
+
+    def flush_char_buffer_as_word(self):
+        if self.char_buffer:
+            word = "".join(self.char_buffer)
+            if word:
+                self.sentence += word.replace(" ", "")
+            self.char_buffer.clear()
+
+    def accept_token(self, token: str):
+        if self.pause_detection:
+            return
+        if token == "SPACE":
+            self.flush_char_buffer_as_word()
+            self.sentence += " "
+            return
+        if token == "CLEAR":
+            self.sentence = ""
+            self.char_buffer.clear()
+            return
+        if len(token) > 1:
+            self.flush_char_buffer_as_word()
+            self.sentence += token
+            return
+        self.char_buffer.append(token)
+
+    def advance(self, label, now):
+        """Feed one frame's label (or None) into the state machine and return the countdowns"""
+        t = self.timings
+        countdowns = {}
+
+        # ---- Hand detected ----
+        if label:
+            self.hand_present = True
+            self.last_hand_time = now
+            self.comma_added = False
+            self.space_added = False
+            self.fullstop_added = False
+
+            if label != self.last_label:
+                self.last_label = label
+                self.label_start_time = now
+
+            elapsed = now - self.label_start_time
+            remaining = max(0.0, t.hold - elapsed)
+            countdowns["hold"] = {"type": "hold", "label": label, "remaining": round(remaining, 2),
+                                  "duration": t.hold}
+
+            if remaining <= 0:
+                if self.last_label and (self.last_accepted_label != self.last_label or
+                                        (now - self.last_accepted_time) >= t.accept_cooldown):
+                    self.accept_token(self.last_label)
+                    self.flush_char_buffer_as_word()
+                    self.last_accepted_label = self.last_label
+                    self.last_accepted_time = now
+                self.last_label = None
+                self.label_start_time = 0.0
+            return countdowns
+
+        # ---- No hand detected ----
+        elapsed = now - self.last_hand_time
+
+        # 1. COMMA countdown
+        if self.space_added and not self.comma_added:
+            countdowns["comma"] = {"type": "comma", "remaining": round(max(0.0, t.comma_after - elapsed), 2),
+                                   "duration": t.comma_after}
+            if elapsed >= t.comma_after:
+                self.sentence = self.sentence.rstrip() + ", "
+                self.comma_added = True
+
+        # 2. SPACE countdown
+        elif self.hand_present and not self.space_added:
+            countdowns["space"] = {"type": "space", "remaining": round(max(0.0, t.space_after - elapsed), 2),
+                                   "duration": t.space_after}
+            if elapsed >= t.space_after:
+                self.sentence += " "
+                self.space_added = True
+
+        # 3. FULLSTOP countdown
+        elif self.space_added and not self.fullstop_added:
+            countdowns["fullstop"] = {"type": "fullstop", "remaining": round(max(0.0, t.fullstop_after - elapsed), 2),
+                                      "duration": t.fullstop_after}
+            if elapsed >= t.fullstop_after:
+                self.sentence = self.sentence.rstrip() + ". "
+                self.fullstop_added = True
+                self.hand_present = False
+                self.last_label = None
+
+        return countdowns
+
+
+class SignSessionRegistry:
+    """Bounded LRU of SignSession objects with idle eviction.
+
+    The registry lock only guards the lookup table; each session carries its own
+    lock, so concurrent streams never wait on each other while updating state.
+    """
+
+    def __init__(self, timings, max_sessions=1024, idle_timeout=900.0):
+        self.timings = timings
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """Return the session for `session_id`, creating it (and evicting stale ones) if needed"""
+        now = time.time()
+        with self._lock:
+            sess = self._sessions.get(session_id)
+            if sess is None:
+                sess = SignSession(session_id, self.timings)
+                self._sessions[session_id] = sess
+            else:
+                self._sessions.move_to_end(session_id)
+            sess.last_seen = now
+            self._evict(now)
+        return sess
+
+    def discard(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict(self, now):
+        # Entries are kept in last-access order, so stale ones are always at the front
+        cutoff = now - self.idle_timeout
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_seen >= cutoff and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
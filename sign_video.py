@@ -0,0 +1,295 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+
+import cv2
+import numpy as np
+
+# Container/codec pairs to try, most browser-friendly first; OpenCV builds differ in what they can encode
+VIDEO_FORMATS = (("mp4", "avc1"), ("webm", "VP80"), ("mp4", "mp4v"))
+
+DEFAULT_PAUSES = {" ": 0.4, ",": 0.3, ".": 0.7, "?": 0.7}
+
+AUDIO_CODECS = {"mp4": "aac", "webm": "libopus"}
+
+
+class SignVideoCompositor:
+    """Stitches per-character sign clips (plus pauses for space/comma/period) into one video per sentence.
+
+    Renders are content-addressed (sentence, the clips it uses and the output settings) in
+    `cache_dir` and served as static files, so a repeated phrase costs one cached fetch.
+    The cache is trimmed to `max_cache_bytes`, least recently used first; at most
+    `max_renders` sentences are encoded at once.
+
+    Every clip is resampled from its own frame rate to `fps`, so playback speed is
+    unchanged. OpenCV writes video only; the clips' audio (with silence for the pauses)
+    is muxed back in with ffmpeg when it is on PATH, otherwise renders are silent.
+    """
+
+    def __init__(self, clip_dirs=("static/signs", "static/signs2"), cache_dir="cache/sign_videos",
+                 max_cache_bytes=512 * 1024 * 1024, size=(640, 480), fps=30.0, pauses=None,
+                 max_renders=2, max_chars=200, audio=True):
+        self.clip_dirs = clip_dirs
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.size = size
+        self.fps = fps
+        self.pauses = pauses or DEFAULT_PAUSES
+        self.max_chars = max_chars
+        self.ffmpeg = shutil.which("ffmpeg") if audio else None
+        if audio and self.ffmpeg is None:
+            print("[WARN] ffmpeg not found; sentence sign videos will have no audio")
+        self._render_slots = threading.BoundedSemaphore(max_renders)
+        self._lock = threading.Lock()
+        self._key_locks = {}  # key -> [lock, requests holding or waiting on it]
+        self.hits = 0
+        self.renders = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.clips = self._scan()
+
+    def _scan(self):
+        clips = {}
+        for directory in self.clip_dirs:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                stem, ext = os.path.splitext(entry.name)
+                if len(stem) == 1 and stem.isalnum() and ext.lower() in (".mp4", ".webm", ".avi", ".mov"):
+                    st = entry.stat()
+                    clips.setdefault(stem.upper(), (entry.path, st.st_size, st.st_mtime))
+        return clips
+
+    def tokens(self, text):
+        """Characters to render: known clips and pause marks, with runs of pauses collapsed"""
+        tokens = []
+        for char in text.strip().upper()[:self.max_chars]:
+            if char in self.pauses:
+                if tokens and tokens[-1] in self.pauses:
+                    # keep the longer pause of the two
+                    if self.pauses[char] > self.pauses[tokens[-1]]:
+                        tokens[-1] = char
+                    continue
+                tokens.append(char)
+            elif char in self.clips:
+                tokens.append(char)
+        return tokens
+
+    def cache_key(self, tokens):
+        used = sorted({t for t in tokens if t in self.clips})
+        raw = json.dumps({
+            "tokens": tokens,
+            "clips": [[c, self.clips[c][1], self.clips[c][2]] for c in used],
+            "size": self.size, "fps": self.fps, "pauses": self.pauses, "audio": bool(self.ffmpeg),
+        }, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def cached_path(self, filename):
+        """Path of a rendered file in the cache (touched so eviction sees it as recently used)"""
+        if os.path.basename(filename) != filename or ".tmp." in filename:
+            # Never serve a render that is still being written
+            return None
+        path = os.path.join(self.cache_dir, filename)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def _find(self, key):
+        """Cached render for `key`, touched as recently used; None if missing or evicted meanwhile"""
+        for ext, _ in VIDEO_FORMATS:
+            path = os.path.join(self.cache_dir, f"{key}.{ext}")
+            try:
+                os.utime(path)
+            except OSError:
+                continue
+            return path
+        return None
+
+    def compose(self, text):
+        """Return (filename, cached) for `text`, rendering it if needed; None if nothing in it can be signed"""
+        tokens = self.tokens(text)
+        if not any(t in self.clips for t in tokens):
+            return None
+        key = self.cache_key(tokens)
+
+        path = self._find(key)
+        if path is not None:
+            with self._lock:
+                self.hits += 1
+            return os.path.basename(path), True
+
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                # Another request may have rendered it while we waited
+                path = self._find(key)
+                if path is not None:
+                    with self._lock:
+                        self.hits += 1
+                    return os.path.basename(path), True
+                with self._render_slots:
+                    path = self._render(tokens, key)
+                with self._lock:
+                    self.renders += 1
+        finally:
+            # Drop the lock only when no other request holds or waits on it
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+        self._evict(keep=path)
+        return os.path.basename(path), False
+
+    def _open_writer(self, key):
+        width, height = self.size
+        for ext, fourcc in VIDEO_FORMATS:
+            tmp = os.path.join(self.cache_dir, f"{key}.{os.getpid()}.{threading.get_ident()}.tmp.{ext}")
+            writer = cv2.VideoWriter(tmp, cv2.VideoWriter_fourcc(*fourcc), self.fps, (width, height))
+            if writer.isOpened():
+                return writer, tmp, os.path.join(self.cache_dir, f"{key}.{ext}")
+            writer.release()
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        raise RuntimeError("No usable video encoder in this OpenCV build")
+
+    def _fit(self, frame):
+        """Letterbox a frame onto the output canvas"""
+        width, height = self.size
+        h, w = frame.shape[:2]
+        scale = min(width / w, height / h)
+        nw, nh = max(1, int(w * scale)), max(1, int(h * scale))
+        canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        x, y = (width - nw) // 2, (height - nh) // 2
+        canvas[y:y + nh, x:x + nw] = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_AREA)
+        return canvas
+
+    def _write_clip(self, writer, path):
+        """Write one clip resampled to the output frame rate; returns (last frame, frames written)"""
+        capture = cv2.VideoCapture(path)
+        src_fps = capture.get(cv2.CAP_PROP_FPS) or self.fps
+        last, read, written = None, 0, 0
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                read += 1
+                # Output frames due by the end of this source frame; 0 drops it, >1 repeats it
+                due = int(read * self.fps / src_fps + 0.5)
+                if due > written:
+                    last = self._fit(frame)
+                    for _ in range(due - written):
+                        writer.write(last)
+                    written = due
+        finally:
+            capture.release()
+        return last, written
+
+    def _render(self, tokens, key):
+        writer, tmp, final = self._open_writer(key)
+        last = np.zeros((self.size[1], self.size[0], 3), dtype=np.uint8)
+        segments = []  # (clip path or None for silence, seconds) for the audio track
+        try:
+            try:
+                for token in tokens:
+                    if token in self.pauses:
+                        # Hold the last frame for the pause
+                        frames = max(1, int(round(self.pauses[token] * self.fps)))
+                        for _ in range(frames):
+                            writer.write(last)
+                        segments.append((None, frames / self.fps))
+                        continue
+                    clip_last, frames = self._write_clip(writer, self.clips[token][0])
+                    if clip_last is not None:
+                        last = clip_last
+                    segments.append((self.clips[token][0], frames / self.fps))
+            finally:
+                writer.release()
+            if self.ffmpeg:
+                self._mux_audio(tmp, segments)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        os.replace(tmp, final)
+        return final
+
+    def _mux_audio(self, video_path, segments):
+        """Replace `video_path` with a copy carrying the clips' audio laid out like the video"""
+        ext = video_path.rsplit(".", 1)[-1]
+        inputs = ["-i", video_path]
+        chains = []
+        for i, (clip, seconds) in enumerate(segments):
+            if clip is None:
+                chains.append(f"anullsrc=r=48000:cl=stereo,atrim=0:{seconds:.4f}[a{i}]")
+            else:
+                inputs += ["-i", clip]
+                chains.append(f"[{len(inputs) // 2 - 1}:a]aresample=48000,aformat=channel_layouts=stereo,"
+                              f"apad,atrim=0:{seconds:.4f}[a{i}]")
+        chains.append("".join(f"[a{i}]" for i in range(len(segments))) + f"concat=n={len(segments)}:v=0:a=1[aout]")
+        muxed = video_path.replace(".tmp.", ".mux.tmp.")
+        command = [self.ffmpeg, "-y", "-loglevel", "error", *inputs, "-filter_complex", ";".join(chains),
+                   "-map", "0:v", "-map", "[aout]", "-c:v", "copy", "-c:a", AUDIO_CODECS.get(ext, "aac"),
+                   "-shortest", muxed]
+        try:
+            subprocess.run(command, check=True, capture_output=True, timeout=120)
+        except (OSError, subprocess.SubprocessError) as e:
+            # Keep the silent render rather than failing the request
+            print("[WARN] Sign video audio mux failed, serving it without audio:", e)
+            try:
+                os.remove(muxed)
+            except OSError:
+                pass
+            return
+        os.replace(muxed, video_path)
+
+    def _evict(self, keep=None):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_file() or ".tmp." in entry.name:
+                continue
+            st = entry.stat()
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+        if total <= self.max_cache_bytes:
+            return
+        for _, size, path in sorted(entries):
+            if total <= self.max_cache_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self):
+        files = [e for e in os.scandir(self.cache_dir) if e.is_file() and ".tmp." not in e.name]
+        with self._lock:
+            return {
+                "clips": len(self.clips),
+                "cached": len(files),
+                "cache_bytes": sum(e.stat().st_size for e in files),
+                "max_cache_bytes": self.max_cache_bytes,
+                "hits": self.hits,
+                "renders": self.renders,
+                "evictions": self.evictions,
+                "audio": bool(self.ffmpeg),
+            }
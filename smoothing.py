@@ -0,0 +1,68 @@
+import numpy as np
+
+
+class ScoreRing:
+    """Fixed-size ring buffer of per-class score vectors for one session"""
+
+    __slots__ = ("scores", "pos", "count", "ema")
+
+    def __init__(self, window, num_classes):
+        self.scores = np.zeros((window, num_classes), dtype=np.float32)
+        self.ema = np.zeros(num_classes, dtype=np.float32)
+        self.pos = 0
+        self.count = 0
+
+    def push(self, vec):
+        self.scores[self.pos] = vec
+        self.pos = (self.pos + 1) % len(self.scores)
+        self.count = min(self.count + 1, len(self.scores))
+
+    def recent(self):
+        return self.scores if self.count == len(self.scores) else self.scores[:self.count]
+
+
+class LabelSmoother:
+    """Smooths per-frame class scores over a short window before they reach the hold state machine.
+
+    `vote`: the class that wins the most of the last `window` frames (a frame whose best
+    score is under the threshold votes for "no hand"). `ema`: exponential moving average
+    of the score vectors with weight `alpha` on the newest frame.
+    """
+
+    MODES = ("off", "vote", "ema")
+
+    def __init__(self, num_classes, mode="vote", window=5, alpha=0.5):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown smoothing mode '{mode}' (expected one of {', '.join(self.MODES)})")
+        self.num_classes = num_classes
+        self.mode = mode
+        self.window = max(1, int(window))
+        self.alpha = float(alpha)
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    def smooth(self, sign_session, scores, threshold):
+        """Push this frame's scores (None = no hand) and return the smoothed (class index, conf) or (None, None)"""
+        ring = sign_session.score_ring
+        if ring is None:
+            ring = sign_session.score_ring = ScoreRing(self.window, self.num_classes)
+        if scores is None:
+            scores = np.zeros(self.num_classes, dtype=np.float32)
+        ring.push(scores)
+
+        if self.mode == "ema":
+            ring.ema *= 1.0 - self.alpha
+            ring.ema += self.alpha * scores
+            best = int(np.argmax(ring.ema))
+            conf = float(ring.ema[best])
+            return (best, conf) if conf >= threshold else (None, None)
+
+        recent = ring.recent()
+        winners = np.where(recent.max(axis=1) >= threshold, recent.argmax(axis=1), -1)
+        votes = np.bincount(winners + 1, minlength=self.num_classes + 1)
+        best = int(np.argmax(votes)) - 1
+        if best < 0:
+            return None, None
+        return best, float(recent[winners == best, best].mean())
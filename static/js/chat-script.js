@@ -1165,14 +1165,9 @@ const response = await fetch(`${this.API_BASE}/get_messages_chat?user_id=${this.
         input.disabled = true;
         input.placeholder = 'Processing grammar...';
         try {
-            const res = await fetch('/grammar_correction', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json', 'X-Requested-With': 'XMLHttpRequest' },
-                body: JSON.stringify({ text })
-            });
-            const data = await res.json();
-            if (!res.ok) {
-                this.showCustomAlert(data.error || `Grammar service error (HTTP ${res.status})`);
+            const data = await runLlmJob('grammar', { text });
+            if (data.error) {
+                this.showCustomAlert(data.error);
                 return;
             }
             const corrected = (data.corrected || data.reply || '').trim();
@@ -1194,14 +1189,9 @@ const response = await fetch(`${this.API_BASE}/get_messages_chat?user_id=${this.
         input.disabled = true;
         input.placeholder = `Styling (${style})...`;
         try {
-            const res = await fetch('/style_enhance', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json', 'X-Requested-With': 'XMLHttpRequest' },
-                body: JSON.stringify({ text, style })
-            });
-            const data = await res.json();
-            if (!res.ok) {
-                this.showCustomAlert(data.error || `Style service error (HTTP ${res.status})`);
+            const data = await runLlmJob('style_enhance', { text, style });
+            if (data.error) {
+                this.showCustomAlert(data.error);
                 return;
             }
             const styled = (data.result || data.text || '').trim();
@@ -1223,14 +1213,9 @@ const response = await fetch(`${this.API_BASE}/get_messages_chat?user_id=${this.
         input.disabled = true;
         input.placeholder = `Translating to ${language}...`;
         try {
-            const res = await fetch('/language_conversion', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json', 'X-Requested-With': 'XMLHttpRequest' },
-                body: JSON.stringify({ text, language })
-            });
-            const data = await res.json();
-            if (!res.ok) {
-                this.showCustomAlert(data.error || `Language conversion error (HTTP ${res.status})`);
+            const data = await runLlmJob('translation', { text, language });
+            if (data.error) {
+                this.showCustomAlert(data.error);
                 return;
             }
             const translated = (data.translated || '').trim();
@@ -2349,13 +2334,7 @@ const res2 = await fetch(`${this.API_BASE}/update_profile_chat`, {
             
             try {
                 // Apply grammar correction
-                const grammarResponse = await fetch('/sentence_correction', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({text: detectedText})
-                });
-                
-                const grammarData = await grammarResponse.json();
+                const grammarData = await runLlmJob('grammar', {text: detectedText});
                 
                 if (grammarData.error) {
                     this.signPopup.countdown.textContent = 'Error in grammar correction: ' + grammarData.error;
@@ -2370,13 +2349,7 @@ const res2 = await fetch(`${this.API_BASE}/update_profile_chat`, {
                     const styleSelect = document.getElementById('popup-style-select');
                     const selectedStyle = styleSelect.value;
                     
-                    const styleResponse = await fetch('/style_enhancement', {
-                        method: 'POST',
-                        headers: {'Content-Type': 'application/json'},
-                        body: JSON.stringify({text: finalText, style: selectedStyle})
-                    });
-                    
-                    const styleData = await styleResponse.json();
+                    const styleData = await runLlmJob('style_enhancement', {text: finalText, style: selectedStyle});
                     
                     if (!styleData.error) {
                         finalText = styleData.enhanced;
@@ -2463,13 +2436,7 @@ const res2 = await fetch(`${this.API_BASE}/update_profile_chat`, {
         }, 200);
         
         try {
-            const response = await fetch('/style_enhancement', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({text: currentText, style: selectedStyle})
-            });
-            
-            const data = await response.json();
+            const data = await runLlmJob('style_enhancement', {text: currentText, style: selectedStyle});
             
             if (data.error) {
                 this.signPopup.countdown.textContent = 'Error: ' + data.error;
@@ -2519,13 +2486,7 @@ const res2 = await fetch(`${this.API_BASE}/update_profile_chat`, {
         }, 200);
         
         try {
-            const response = await fetch('/language_conversion', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({text: currentText, language: selectedLanguage})
-            });
-            
-            const data = await response.json();
+            const data = await runLlmJob('translation', {text: currentText, language: selectedLanguage});
             
             if (data.error) {
                 this.signPopup.countdown.textContent = 'Error: ' + data.error;
@@ -0,0 +1,35 @@
+// Queued LLM jobs: submit to /api/jobs and poll until the job finishes, so no request
+// stays open while Ollama works. Resolves to the job's result, or { error } on failure.
+async function runLlmJob(kind, params, { timeout = 180000 } = {}) {
+    try {
+        let response = await fetch('/api/jobs', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'X-Requested-With': 'XMLHttpRequest' },
+            body: JSON.stringify({ ...params, kind })
+        });
+        let job = await response.json();
+        const deadline = Date.now() + timeout;
+        let delay = 400;
+        while (response.ok && (job.status === 'queued' || job.status === 'running')) {
+            if (Date.now() > deadline) {
+                return { error: 'The language model is taking too long. Please try again.' };
+            }
+            await new Promise(resolve => setTimeout(resolve, delay));
+            delay = Math.min(delay * 1.5, 2000);
+            response = await fetch(`/api/jobs/${encodeURIComponent(job.job_id)}`);
+            job = await response.json();
+        }
+        if (!response.ok) {
+            return { error: job.error || `Language model service error (HTTP ${response.status})` };
+        }
+        if (job.status === 'failed') {
+            return { error: job.error || 'Language model job failed' };
+        }
+        return job.result || {};
+    } catch (error) {
+        console.error(`LLM job (${kind}) error:`, error);
+        return { error: 'Network error. Please check your connection and try again.' };
+    }
+}
+
+window.runLlmJob = runLlmJob;
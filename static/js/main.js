@@ -1,4 +1,28 @@
 // Main JavaScript functionality
+
+// Read a Server-Sent Events response body, calling onEvent(eventName, parsedData) for each event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let event = 'message', data = '';
+            for (const line of raw.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
 class LandingPage {
     constructor() {
         this.init();
@@ -683,7 +707,8 @@ document.addEventListener('DOMContentLoaded', () => {
             chatbotMessages.appendChild(loadingMessage);
             chatbotMessages.scrollTop = chatbotMessages.scrollHeight;
 
-            const response = await fetch('/api/chatbot', {
+            // Stream the reply token by token (Server-Sent Events over a POST response)
+            const response = await fetch('/stream/chatbot', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -691,20 +716,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 body: JSON.stringify({ message: message })
             });
 
-            const data = await response.json();
-
-            // Remove loading animation
-            loadingMessage.remove();
-
-            if (response.ok) {
-                const botMessage = document.createElement('div');
-                botMessage.classList.add('message', 'bot-message');
-                botMessage.innerHTML = `
-                    <div class="message-avatar"><i class="fas fa-robot"></i></div>
-                    <div class="message-content"><p>${data.reply}</p></div>
-                `;
-                chatbotMessages.appendChild(botMessage);
-            } else {
+            if (!response.ok) {
+                const data = await response.json().catch(() => ({}));
+                loadingMessage.remove();
                 const errorMessage = document.createElement('div');
                 errorMessage.classList.add('message', 'bot-message');
                 errorMessage.innerHTML = `
@@ -712,6 +726,30 @@ document.addEventListener('DOMContentLoaded', () => {
                     <div class="message-content"><p>Sorry, I couldn't process your message. ${data.error || 'Please try again.'}</p></div>
                 `;
                 chatbotMessages.appendChild(errorMessage);
+            } else {
+                const botMessage = document.createElement('div');
+                botMessage.classList.add('message', 'bot-message');
+                botMessage.innerHTML = `
+                    <div class="message-avatar"><i class="fas fa-robot"></i></div>
+                    <div class="message-content"><p></p></div>
+                `;
+                const replyText = botMessage.querySelector('p');
+
+                await readEventStream(response, (event, data) => {
+                    if (loadingMessage.isConnected) {
+                        loadingMessage.remove();
+                        chatbotMessages.appendChild(botMessage);
+                    }
+                    if (event === 'token') {
+                        replyText.textContent += data.token;
+                    } else if (event === 'result') {
+                        replyText.textContent = data.reply;
+                    } else if (event === 'error') {
+                        replyText.textContent = `Sorry, I couldn't process your message. ${data.error || 'Please try again.'}`;
+                    }
+                    chatbotMessages.scrollTop = chatbotMessages.scrollHeight;
+                });
+                if (loadingMessage.isConnected) loadingMessage.remove();
             }
         } catch (error) {
             console.error('Error:', error);
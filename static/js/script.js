@@ -225,14 +225,7 @@ document.addEventListener('DOMContentLoaded', () => {
         grammarBtn.disabled = true;
 
         try {
-          const response = await fetch('/grammar_correction', {
-            method: 'POST',
-            headers: {
-              'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ text: text })
-          });
-          const data = await response.json();
+          const data = await runLlmJob('grammar', { text: text });
           if (data.corrected) {
             chatInput.value = data.corrected;
             chatInput.focus();
@@ -283,14 +276,7 @@ document.addEventListener('DOMContentLoaded', () => {
           styleBtn.disabled = true;
 
           try {
-            const response = await fetch('/style_enhancement', {
-              method: 'POST',
-              headers: {
-                'Content-Type': 'application/json'
-              },
-              body: JSON.stringify({ text: text, style: style })
-            });
-            const data = await response.json();
+            const data = await runLlmJob('style_enhancement', { text: text, style: style });
             if (data.enhanced) {
               chatInput.value = data.enhanced;
               chatInput.focus();
@@ -825,8 +811,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (sttEls.countdown) sttEls.countdown.textContent = 'Processing detected sentence...';
         if (sttEls.progress) sttEls.progress.style.width = '0%';
         try {
-          const grammarResponse = await fetch('/sentence_correction', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ text: detectedText }) });
-          const grammarData = await grammarResponse.json();
+          const grammarData = await runLlmJob('grammar', { text: detectedText });
           if (!grammarData.error) {
             let finalText = grammarData.corrected;
             // optional style pass can be added here if needed
@@ -893,12 +878,7 @@ document.addEventListener('DOMContentLoaded', () => {
           const text = (sttEls.sentence?.innerText || '').trim();
           if (!text) { sttStyleDropdown.style.display = 'none'; return; }
           try {
-            const response = await fetch('/style_enhancement', {
-              method: 'POST',
-              headers: { 'Content-Type': 'application/json' },
-              body: JSON.stringify({ text, style })
-            });
-            const data = await response.json();
+            const data = await runLlmJob('style_enhancement', { text, style });
             if (data.enhanced && sttEls.sentence) {
               sttEls.sentence.innerText = data.enhanced;
               stt.sentenceServer = data.enhanced;
@@ -1444,19 +1424,36 @@ function renderImages() {
       back.textContent = item.special;
       wrapper.setAttribute('aria-label', `special: ${item.special}`);
     } else if (item.img) {
-      const char = item.img.split('/').pop().replace('.jpeg', '').toUpperCase();
+      const char = item.char || item.img.split('/').pop().replace('.jpeg', '').toUpperCase();
       const img = document.createElement('img');
-      img.src = item.img;
       img.alt = `Sign for ${char}`;
       img.loading = 'lazy';
-      front.appendChild(img);
+      if (item.sprite) {
+        // One shared sprite sheet for every glyph; the full image is only fetched when enlarged
+        const sprite = document.createElement('div');
+        sprite.className = 'glyph-sprite';
+        sprite.setAttribute('role', 'img');
+        sprite.setAttribute('aria-label', img.alt);
+        sprite.style.width = '100%';
+        sprite.style.height = '100%';
+        sprite.style.aspectRatio = item.sprite.aspect;
+        sprite.style.borderRadius = '12px';
+        sprite.style.backgroundImage = `url(${item.sprite.atlas})`;
+        sprite.style.backgroundSize = item.sprite.size;
+        sprite.style.backgroundPosition = item.sprite.position;
+        sprite.style.backgroundRepeat = 'no-repeat';
+        front.appendChild(sprite);
+      } else {
+        img.src = item.img;
+        front.appendChild(img);
+      }
       back.textContent = char;
       wrapper.setAttribute('aria-label', `sign for ${char}`);
 
       // Add click listener to wrapper
       wrapper.addEventListener('click', () => {
-        if (img && img.src) {
-          showEnlargedImage(img.src, img.alt);
+        if (item.img) {
+          showEnlargedImage(item.img, img.alt);
         }
       });
     }